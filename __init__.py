@@ -8,6 +8,17 @@ import engine
 import events
 import geometry
 import common
+import spatial
+import physics
+import radar
+import tournament
+import protocol
+import framebuffer
+import replay
+import scheduler
+import sandbox
+import profiler
+import registry
 
 __all__ = [
     'engine',
@@ -16,7 +27,18 @@ __all__ = [
     'geometry',
     'objects',
     'user_interface',
-    'common'
+    'common',
+    'spatial',
+    'physics',
+    'radar',
+    'tournament',
+    'protocol',
+    'framebuffer',
+    'replay',
+    'scheduler',
+    'sandbox',
+    'profiler',
+    'registry'
 ]
 
 version = '1.0.0'
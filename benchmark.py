@@ -0,0 +1,198 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+    Engine benchmarks. Run as script:
+
+        python benchmark.py [-o benchmark.json] [-s mixed_10,mixed_100]
+
+    Every scenario is run in its own process - for the honest peak memory.
+    Results are written to the JSON file, so runs before and after
+    the engine change can be compared
+"""
+
+import gc
+import json
+import platform
+import random
+import sys
+import time
+from multiprocessing import Process, Pipe
+from optparse import OptionParser
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+import engine
+from common import random_point
+from objects import StaticTarget, Target, Shot
+
+
+class Scenario:
+    """
+        Benchmark scene description
+    """
+
+    def __init__(self, name, tanks_count, shots_count, ticks, warmup=2):
+        self.name = name
+        self.tanks_count = tanks_count
+        self.shots_count = shots_count
+        self.ticks = ticks
+        self.warmup = warmup
+
+
+scenarios = [
+    Scenario('mixed_10', 10, 0, 500),
+    Scenario('mixed_100', 100, 0, 100),
+    Scenario('mixed_1000', 1000, 0, 5),
+    Scenario('mixed_10000', 10000, 0, 1, warmup=0),
+    Scenario('shots_100', 100, 1000, 50),
+    Scenario('shots_1000', 1000, 10000, 3),
+]
+
+
+def _add_shots(tanks, shots_count):
+    for i in range(shots_count):
+        shot = Shot(pos=random_point(Shot.radius),
+                    direction=random.randint(0, 359))
+        shot.owner = random.choice(tanks)
+
+
+def mixed_scene(tanks_count, shots_count=0):
+    """
+        Make scene with moving targets, static targets and
+        sample robots in equal parts, and flying shots
+    """
+    from sample_game import SimpleTank
+
+    scene = engine.Scene('benchmark')
+    tank_classes = (Target, StaticTarget, SimpleTank)
+    tanks = [tank_classes[i % len(tank_classes)]()
+             for i in range(tanks_count)]
+    _add_shots(tanks, shots_count)
+    return scene
+
+
+def time_ticks(scene, ticks):
+    """
+        Average time of one game tick, in seconds
+    """
+    begin = time.time()
+    for i in range(ticks):
+        scene._step += 1
+        scene._game_step()
+    return (time.time() - begin) / ticks
+
+
+def measure(scenario, seed=42, ticks_scale=1.0):
+    """
+        Run the scenario in this process, returns dict of results:
+        ticks per second, per-phase times (profiler p50/p99 in seconds),
+        peak RSS in KB and net growth of gc-tracked objects per tick.
+        It is not the allocations count - Python 2 can not trace them,
+        objects freed in the tick are not seen and only containers
+        are tracked, so it may be negative
+    """
+    ticks = max(int(scenario.ticks * ticks_scale), 1)
+    random.seed(seed)
+    scene = mixed_scene(scenario.tanks_count, scenario.shots_count)
+    if scenario.warmup:
+        time_ticks(scene, scenario.warmup)
+    # скорость - без профайлера, он сам тратит время
+    tick_time = time_ticks(scene, ticks)
+    scene.enable_profiler()
+    gc.collect()
+    gc.disable()
+    try:
+        objects_before = len(gc.get_objects())
+        time_ticks(scene, ticks)
+        objects_after = len(gc.get_objects())
+    finally:
+        gc.enable()
+    if resource is not None:
+        peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    else:
+        peak_rss = None
+    phases = {}
+    for name, phase in scene.stats().phases.iteritems():
+        phases[name] = {'p50': phase['p50'], 'p99': phase['p99'],
+                        'mean': phase['mean']}
+    return {
+        'name': scenario.name,
+        'tanks': scenario.tanks_count,
+        'shots': scenario.shots_count,
+        'ticks': ticks,
+        'ticks_per_second': 1.0 / tick_time if tick_time else None,
+        'ms_per_tick': tick_time * 1000,
+        'phases': phases,
+        'peak_rss_kb': peak_rss,
+        'net_tracked_objects_per_tick':
+            float(objects_after - objects_before) / ticks,
+        'grounds_left': len(scene.grounds),
+    }
+
+
+def _measure_worker(conn, scenario, seed, ticks_scale):
+    conn.send(measure(scenario, seed, ticks_scale))
+    conn.close()
+
+
+def run_suite(selected=None, seed=42, ticks_scale=1.0, on_result=None):
+    """
+        Run scenarios (all or with names from <selected>),
+        each in the separate process. Returns list of results
+    """
+    results = []
+    for scenario in scenarios:
+        if selected and scenario.name not in selected:
+            continue
+        parent_conn, child_conn = Pipe()
+        worker = Process(target=_measure_worker,
+                         args=(child_conn, scenario, seed, ticks_scale))
+        worker.start()
+        result = parent_conn.recv()
+        worker.join()
+        results.append(result)
+        if on_result is not None:
+            on_result(result)
+    return results
+
+
+def _print_result(result):
+    print '%-12s %8.1f ticks/s %10.2f ms/tick %8s KB %8.1f net objs/tick' \
+          % (result['name'], result['ticks_per_second'] or 0,
+             result['ms_per_tick'], result['peak_rss_kb'],
+             result['net_tracked_objects_per_tick'])
+    sys.stdout.flush()
+
+
+if __name__ == '__main__':
+    parser = OptionParser(usage='%prog [options]')
+    parser.add_option('-o', '--output', default='benchmark.json',
+                      help='JSON file for results [%default]')
+    parser.add_option('-s', '--scenarios', default='',
+                      help='comma separated names of scenarios: '
+                           + ', '.join([scenario.name
+                                        for scenario in scenarios]))
+    parser.add_option('-t', '--ticks-scale', type='float', default=1.0,
+                      help='multiplier of ticks count [%default]')
+    parser.add_option('--seed', type='int', default=42)
+    options, args = parser.parse_args()
+
+    selected = [name for name in options.scenarios.split(',') if name]
+    results = run_suite(selected, options.seed, options.ticks_scale,
+                        on_result=_print_result)
+    report = {
+        'date': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'seed': options.seed,
+        'results': results,
+    }
+    output = open(options.output, 'w')
+    try:
+        json.dump(report, output, indent=2, sort_keys=True)
+    finally:
+        output.close()
+    print 'results are written to', options.output
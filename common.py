@@ -1,6 +1,9 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
+import sys
+from collections import deque
+
 import constants
 import random
 import geometry
@@ -10,22 +13,63 @@ _debug = False
 
 class Logger:
     """
-        Logging game events
+        Logging game events. In DEBUG mode records (tick, object id,
+        object name, pattern, args) go to the ring buffer of the last
+        <size> records, they are formatted only at dump().
+        Arguments are kept as is, so callers must pass plain values
+        (numbers, ids, strings), not game objects - those would be shown
+        in their state at the dump. Call sites in the hot paths
+        check common._debug themselves
     """
 
+    def __init__(self, size=constants.debug_log_size):
+        self.records = deque(maxlen=size)
+        self.tick = 0
+
     def debug(self, pattern, *args):
-        to_console(pattern, *args)
+        if _debug:
+            self.records.append((self.tick, None, None, pattern, args))
+
+    def record(self, obj_id, obj_name, pattern, args):
+        """
+            Record of the game object, DEBUG mode is not checked
+        """
+        self.records.append((self.tick, obj_id, obj_name, pattern, args))
+
+    def dump(self, out=None):
+        """
+            Write formatted records to <out> (stdout by default)
+            and clear the buffer
+        """
+        if out is None:
+            out = sys.stdout
+        while self.records:
+            out.write(format_record(self.records.popleft()) + '\n')
 
 log = Logger()
 
 
+def format_message(pattern, args):
+    pattern = str(pattern)
+    try:
+        return pattern % args
+    except TypeError:
+        return ' '.join([pattern] + [str(arg) for arg in args])
+
+
+def format_record(record):
+    tick, obj_id, obj_name, pattern, args = record
+    message = format_message(pattern, args)
+    if obj_id is None:
+        return '%s %s' % (tick, message)
+    if obj_name is None:
+        return '%s %s:%s' % (tick, obj_id, message)
+    return '%s %s:%s:%s' % (tick, obj_name, obj_id, message)
+
+
 def to_console(pattern, *args):
     if _debug:
-        pattern = str(pattern)
-        try:
-            print pattern % args
-        except TypeError:
-            print pattern, ' '.join([str(arg) for arg in args])
+        print format_message(pattern, args)
 
 
 def random_point(object_radius=32):
@@ -25,6 +25,23 @@ shot_life = 60  # in game ticks
 background_color = (85, 107, 47)
 resolution = (field_width, field_height)
 data_path = os.path.join(os.path.dirname(__file__), 'data')
+overlay_bar_steps = 16  # armor and gun heat bars lengths quantization
+overlay_cache_size = 1000  # armor and heat bars images in the cache
+ui_interpolation_max_period = 0.25  # seconds between engine frames
 
 # engine constants
 game_step_min_time = 0.015
+game_max_catch_up_steps = 5
+frame_buffer_slots = 3
+frame_buffer_slot_size = 1024 * 1024  # in bytes
+profiler_samples = 500  # in game ticks
+profiler_stats_interval = 1.0  # in seconds
+debug_log_size = 10000  # records in the debug log
+
+# sandbox constants
+robot_cpu_budget = 0.01  # CPU seconds for handlers of one tank in a tick
+robot_tick_deadline = 1.0  # wall clock seconds to wait for all teams
+
+# replay constants
+replay_keyframe_interval = 100  # in game ticks
+replay_seek_ticks = 500
@@ -1,9 +1,10 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
-import time
-import math
+from itertools import chain
 from multiprocessing import Process, Pipe
+# самый точный таймер платформы
+from timeit import default_timer as timer
 
 from user_interface import UserInterface
 import geometry
@@ -11,42 +12,48 @@ import objects
 import common
 import constants
 import events
-
-
-class ObjectState:
+import spatial
+import physics
+import radar
+import sandbox
+import protocol
+from registry import ObjectRegistry
+from protocol import ObjectState
+from framebuffer import FrameBuffer
+from replay import ReplayRecorder
+from scheduler import Scheduler
+from profiler import TickProfiler
+
+# ObjectState жил здесь до protocol - оставлен для совместимости
+__all__ = ['Scene', 'MatchResult', 'ObjectState', 'start_ui']
+
+
+class MatchResult:
     """
-        Hold game object state, useful for exchange between processes
+        Compact result of the match, can be sent between processes
     """
-    params = (
-        'id',
-        'coord',
-        'course',
-        'armor',
-        'gun_heat',
-        '_revolvable',
-        '_img_file_name',
-        '_layer',
-        '_selectable',
-        '_animated'
-        )
-
-    def __init__(self, obj):
-        for param in self.params:
-            if hasattr(obj, param):
-                val = getattr(obj, param)
-                setattr(self, param, val)
-        if hasattr(obj, '_detected_by'):
-            self._detected_by = [
-                detected_by_obj.id
-                for detected_by_obj in obj._detected_by
-            ]
-        else:
-            self._detected_by = []
 
+    def __init__(self, ticks, tanks, survivors):
+        self.ticks = ticks
+        self.survivors = [tank.id for tank in survivors]
+        self.classes = {}
+        self.damage_dealt = {}
+        self.damage_taken = {}
+        for tank in tanks:
+            self.classes[tank.id] = tank.__class__.__name__
+            self.damage_dealt[tank.id] = tank._damage_dealt
+            self.damage_taken[tank.id] = tank._damage_taken
+
+    def __str__(self):
+        return 'match(ticks=%s survivors=%s)' % (self.ticks, self.survivors)
 
-def start_ui(name, child_conn):
+    def __repr__(self):
+        return str(self)
+
+
+def start_ui(name, child_conn, frames=None):
     ui = UserInterface(name)
-    ui.run(child_conn)
+    ui.run(child_conn, frames)
 
 
 class Scene:
@@ -54,35 +61,149 @@ class Scene:
         Game scene. Container for all game objects.
     """
 
-    def __init__(self, name):
-        self.grounds = []
-        self.shots = []
-        self.explosions = []
+    def __init__(self, name, numpy_physics=False, profile=False):
+        """
+            Make scene. If <numpy_physics> is True objects movement is
+            computed for all of them at once by numpy arrays.
+            If <profile> is True game tick phases are timed (see stats)
+        """
+        self.grounds = ObjectRegistry()
+        self.shots = ObjectRegistry()
+        self.explosions = ObjectRegistry()
 
         objects.Shot.container = self.shots
         objects.Explosion.container = self.explosions
         objects.Tank.container = self.grounds
 
+        if numpy_physics:
+            self.physics = physics.ArrayPhysics()
+        else:
+            self.physics = None
+        objects.GameObject._physics = self.physics
+        self.dispatcher = events.EventDispatcher()
+        objects.GameObject._dispatcher = self.dispatcher
+
+        self.sandboxes = []
+        self.sandbox_deadline = constants.robot_tick_deadline
+
+        self._profiler = None
+        self.enable_profiler(profile)
+
         self.hold_state = False  # режим пошаговой отладки
         self._step = 0
         self.name = name
+        self.recorder = None
+
+    def start_recording(self, path):
+        """
+            Record every game tick to the replay file <path>
+        """
+        self.stop_recording()
+        self.recorder = ReplayRecorder(path)
+
+    def stop_recording(self):
+        """
+            Stop recording and close the replay file
+        """
+        if self.recorder is not None:
+            self.recorder.close()
+            self.recorder = None
+
+    def enable_profiler(self, enabled=True):
+        """
+            Switch timing of the game tick phases
+        """
+        if enabled:
+            if self._profiler is None:
+                self._profiler = TickProfiler()
+        else:
+            self._profiler = None
+
+    def stats(self):
+        """
+            Timings of the game tick phases - profiler.TickStats,
+            None if profiler is not enabled
+        """
+        if self._profiler is None:
+            return None
+        return self._profiler.stats()
+
+    def isolate_teams(self, robot_classes,
+                      cpu_budget=constants.robot_cpu_budget,
+                      deadline=constants.robot_tick_deadline):
+        """
+            Run code of the robots of <robot_classes> in the separate
+            processes - one per class. Handlers of one tank may spend
+            <cpu_budget> CPU seconds per tick, the game waits for all
+            teams not more than <deadline> seconds. Must be called after
+            the tanks are created and before the game begins
+        """
+        self.sandbox_deadline = deadline
+        for robot_class in robot_classes:
+            tanks = [tank for tank in self.grounds
+                     if tank.__class__ is robot_class]
+            if tanks:
+                self.sandboxes.append(
+                    sandbox.TeamSandbox(robot_class, tanks, cpu_budget))
+
+    def close_sandboxes(self):
+        """
+            Stop the robots processes
+        """
+        for team_sandbox in self.sandboxes:
+            team_sandbox.close()
+        self.sandboxes = []
+
+    def _flush_removed(self):
+        """
+            Drop objects removed since the last flush
+        """
+        self.grounds.flush()
+        self.shots.flush()
+        self.explosions.flush()
+
+    def _all_objects(self):
+        return chain(self.grounds, self.shots, self.explosions)
 
     def _game_step(self):
         """
             Proceed objects states, collision detection, hits
             and radars discovering
         """
-        for obj in self.grounds + self.shots:
-            obj._distance_cache = {}
+        prof = self._profiler
+        if prof is not None:
+            tick_started = phase_started = timer()
+            radar_time = hits_time = 0.0
+        debug = common._debug
+        if debug:
+            common.log.tick = self._step
+        # могли удалить и между шагами игры
+        self._flush_removed()
         for obj in self.grounds:
             obj._radar_detected_objs = []
             obj._detected_by = []
         searched_left_ids = []
-        for left in self.grounds[:]:
+        # сравниваем только танки из соседних клеток сетки
+        grounds_grid = spatial.SpatialGrid(_grounds_cell_size(self.grounds),
+                                           self.grounds)
+        shots_grid = spatial.SpatialGrid(
+            _shots_cell_size(self.grounds, self.shots), self.shots)
+        if prof is not None:
+            prof.add('grids', timer() - phase_started)
+            phase_started = timer()
+        for left in self.grounds:
             #~ searched_left_ids.append(left.id)
-            left.debug(">>> start proceed at scene step")
-            left.debug(str(left))
-            for right in self.grounds[:]:
+            if debug:
+                left.debug(">>> start proceed at scene step "
+                           "x=%.1f y=%.1f cour=%.1f %s", left.coord.x,
+                           left.coord.y, left.course, left._state)
+            neighbours = grounds_grid.neighbours(left.coord)
+            # луч радара строим один раз, при первой цели в зоне действия
+            radar_beam = None
+            index = 0
+            while index < len(neighbours):
+                right = neighbours[index]
+                index += 1
                 if (right.id == left.id) or (right.id in searched_left_ids):
                     continue
                 distance = left.distance_to(right)
@@ -90,56 +211,176 @@ class Scene:
                 overlap_distance = int(left.radius + right.radius - distance)
                 if overlap_distance > 1:
                     # могут пересекаться одним пикселем
-                    step_back_vector = geometry.Vector(right,
-                                                       left,
-                                                       overlap_distance // 2)
-                    left.debug('step_back_vector %s', step_back_vector)
+                    step_back_vector = geometry.Vector.between(
+                        right.coord, left.coord, overlap_distance // 2)
+                    if debug:
+                        left.debug('step_back_vector dx=%.2f dy=%.2f',
+                                   step_back_vector.dx, step_back_vector.dy)
                     left.coord.add(step_back_vector)
                     right.coord.add(-step_back_vector)
-                    left._events.put(events.EventCollide(right))
-                    right._events.put(events.EventCollide(left))
+                    grounds_grid.move(right)
+                    if grounds_grid.move(left):
+                        # сменили клетку - соседи поменялись
+                        neighbours = grounds_grid.neighbours(left.coord,
+                                                             after=right)
+                        index = 0
+                    self.dispatcher.post(left, events.EventCollide(right))
+                    self.dispatcher.post(right, events.EventCollide(left))
                 # радары
                 if distance < constants.tank_radar_range:
-                    left.debug("distance < constants.tank_radar_range for %s",
-                               right.id)
-                    if _in_radar_fork(left, right):
-                        left.debug("see %s", right.id)
+                    if prof is not None:
+                        radar_started = timer()
+                    if debug:
+                        left.debug("distance < tank_radar_range for %s",
+                                   right.id)
+                    if radar_beam is None:
+                        radar_beam = radar.RadarBeam(left)
+                    if radar_beam.contains(right):
+                        if debug:
+                            left.debug("see %s", right.id)
                         if right.armor > 0:
                             left._radar_detected_objs.append(right)
                             right._detected_by.append(left)
+                    if prof is not None:
+                        radar_time += timer() - radar_started
+            if prof is not None:
+                hits_started = timer()
             # попадания (список летяших снарядов может уменьшаться)
-            for shot in self.shots[:]:
+            for shot in shots_grid.neighbours(left.coord):
                 if shot.owner and shot.owner == left:
                     continue
                 if _collide_circle(shot, left):
                     left.hit(shot)
                     shot.detonate_at(left)
-                    # self.shots.remove(shot)
+                    # снаряд взорвался - другим танкам уже не достанется
+                    shots_grid.remove(shot)
+            if prof is not None:
+                hits_time += timer() - hits_started
+            if left._armor <= 0:
+                # танк взорван - больше не участвует в проверках
+                grounds_grid.remove(left)
+        if prof is not None:
+            now = timer()
+            prof.add('collision', now - phase_started - radar_time - hits_time)
+            prof.add('radar', radar_time)
+            prof.add('shot hits', hits_time)
+            phase_started = now
+        # взорванные танки и снаряды больше не участвуют в игре
+        self._flush_removed()
         # после главного цикла - евенты могут меняться
         for obj in self.grounds:
-            if obj._radar_detected_objs:
+            if obj.radar_changes_only:
+                self._post_radar_changes(obj)
+            elif obj._radar_detected_objs:
                 radar_event = events.EventRadarRange(obj._radar_detected_objs)
-                obj._events.put(radar_event)
-            obj._proceed_events()
+                self.dispatcher.post(obj, radar_event)
+        if self.sandboxes:
+            # изолированные роботы думают все вместе, до шага игры
+            sandbox.run_sandboxes(self.sandboxes, self.grounds,
+                                  self.dispatcher, self.sandbox_deadline)
+        if prof is not None:
+            self._profiled_steps(prof, phase_started)
+        else:
+            for obj in self.grounds:
+                if obj._sandbox is None:
+                    self.dispatcher.dispatch(obj)
+                obj._game_step()
+            for obj in chain(self.shots, self.explosions):
+                obj._game_step()
+        self._flush_removed()
+
+        if self.physics is not None:
+            if prof is not None:
+                phase_started = timer()
+            self.physics.step(list(self._all_objects()))
+            if prof is not None:
+                prof.add('physics', timer() - phase_started)
+
+        if self.recorder is not None:
+            if prof is not None:
+                phase_started = timer()
+            self.recorder.record(self._step, self._all_objects())
+            if prof is not None:
+                prof.add('record', timer() - phase_started)
+
+        if prof is not None:
+            prof.add('tick', timer() - tick_started)
+            prof.end_tick()
+
+    def _profiled_steps(self, prof, events_started):
+        """
+            Events dispatch and objects steps with timing,
+            steps are timed by objects classes
+        """
+        events_time = timer() - events_started
+        steps_times = {}
+        for obj in self.grounds:
+            started = timer()
+            if obj._sandbox is None:
+                self.dispatcher.dispatch(obj)
+            dispatched = timer()
             obj._game_step()
-
-        for obj in self.shots + self.explosions:
+            events_time += dispatched - started
+            class_name = obj.__class__.__name__
+            steps_times[class_name] = steps_times.get(class_name, 0.0) \
+                                      + timer() - dispatched
+        for obj in chain(self.shots, self.explosions):
+            started = timer()
             obj._game_step()
-
-        if common._debug:
-            common.log.debug('=' * 20, self._step, '=' * 10)
-
-    def go(self):
+            class_name = obj.__class__.__name__
+            steps_times[class_name] = steps_times.get(class_name, 0.0) \
+                                      + timer() - started
+        prof.add('events', events_time)
+        for class_name, seconds in steps_times.iteritems():
+            prof.add('step %s' % class_name, seconds)
+
+    def _post_radar_changes(self, obj):
+        """
+            Radar events only if radar sees other objects than
+            at the previous tick
+        """
+        detected_objs = obj._radar_detected_objs
+        known_objs = obj._radar_known_objs
+        detected_ids = set([detected.id for detected in detected_objs])
+        known_ids = set([known.id for known in known_objs])
+        if detected_ids == known_ids:
+            return
+        obj._radar_known_objs = detected_objs
+        if detected_objs:
+            self.dispatcher.post(obj, events.EventRadarRange(detected_objs))
+        entered = [detected for detected in detected_objs
+                   if detected.id not in known_ids]
+        if entered:
+            self.dispatcher.post(obj, events.EventEnteredRadarRange(entered))
+        left = [known for known in known_objs
+                if known.id not in detected_ids]
+        if left:
+            self.dispatcher.post(obj, events.EventLeftRadarRange(left))
+
+    def go(self, shared_frames=True, speed=1.0):
         """
             Main game cycle - the game begin!
+            If <shared_frames> - objects states go to UI through
+            the shared memory, only born/died objects - through the pipe.
+            Game <speed>: 1 - real time, N - N times faster,
+            None - as fast as possible
         """
         self.parent_conn, child_conn = Pipe()
-        self.ui = Process(target=start_ui, args=(self.name, child_conn,))
+        if shared_frames:
+            frames = FrameBuffer()
+        else:
+            frames = None
+        self.ui = Process(target=start_ui,
+                          args=(self.name, child_conn, frames))
         self.ui.start()
+        state_encoder = protocol.StateEncoder()
+        # UI рисует со своей скоростью, чаще кадры не шлем
+        scheduler = Scheduler(speed=speed,
+                              render_fps=UserInterface._max_fps)
+        not_rendered = False
+        stats_sent_at = timer()
 
         while True:
-            cycle_begin = time.time()
-
             # проверяем, есть ли новое состояние UI на том конце трубы
             ui_state = None
             while self.parent_conn.poll(0):
@@ -158,33 +399,79 @@ class Scene:
                 if ui_state.switch_debug:
                     if common._debug:  # были в режиме отладки
                         self.hold_state = False
+                        # записи отладки - в консоль, разом
+                        common.log.dump()
                     else:
                         self.hold_state = True
                     common._debug = not common._debug
 
-            # шаг игры, если надо
-            if not self.hold_state or (ui_state and ui_state.one_step):
+            # шаги игры, если надо
+            if self.hold_state:
+                scheduler.reset()
+                steps = int(bool(ui_state and ui_state.one_step))
+            else:
+                steps = scheduler.steps_due()
+            for i in range(steps):
                 self._step += 1
                 self._game_step()
-                # отсылаем новое состояние обьектов в UI
-                objects_state = {}
-                for obj in self.grounds + self.shots + self.explosions:
-                    objects_state[obj.id] = ObjectState(obj)
-                self.parent_conn.send(objects_state)
-
-            # вычисляем остаток времени на сон
-            cycle_time = time.time() - cycle_begin
-            cycle_time_rest = constants.game_step_min_time - cycle_time
-            if cycle_time_rest > 0:
-                # о! есть время поспать... :)
-                # print "sleep for %.6f" % cycle_time_rest
-                time.sleep(cycle_time_rest)
+                not_rendered = True
+
+            if not_rendered and (self.hold_state or scheduler.render_due()):
+                not_rendered = False
+                prof = self._profiler
+                if prof is not None:
+                    phase_started = timer()
+                # отсылаем в UI только изменения состояний обьектов
+                state_delta = state_encoder.encode(self._all_objects(),
+                                                   full=frames is not None)
+                if prof is not None:
+                    now = timer()
+                    # отрисовка - после шагов игры, отдельными замерами
+                    prof.add_sample('state build', now - phase_started)
+                    phase_started = now
+                if frames is not None and frames.write(state_delta.packed):
+                    # состояния ушли через общую память
+                    state_delta.packed = ''
+                if state_delta:
+                    self.parent_conn.send(state_delta)
+                if prof is not None:
+                    now = timer()
+                    prof.add_sample('pipe send', now - phase_started)
+                    if now - stats_sent_at > constants.profiler_stats_interval:
+                        stats_sent_at = now
+                        self.parent_conn.send(prof.stats())
+
+            # о! есть время поспать... :)
+            scheduler.wait()
 
         # ждем пока потомки помрут
         self.ui.join()
+        self.stop_recording()
+        self.close_sandboxes()
 
         print 'Thank for playing robopycode! See you in the future :)'
 
+    def run_headless(self, max_ticks, stop_condition=None):
+        """
+            Game cycle without user interface - no UI process, no objects
+            state exchange and no sleeping, ticks as fast as CPU allows.
+            Stops after <max_ticks> or when <stop_condition>(scene)
+            returns True. Returns MatchResult
+        """
+        tanks = list(self.grounds)
+        ticks = 0
+        while ticks < max_ticks:
+            if stop_condition is not None and stop_condition(self):
+                break
+            self._step += 1
+            self._game_step()
+            ticks += 1
+        self.close_sandboxes()
+        # танки могли родиться и во время игры
+        known_ids = set(tank.id for tank in tanks)
+        tanks += [tank for tank in self.grounds if tank.id not in known_ids]
+        return MatchResult(ticks, tanks, self.grounds)
+
 ############################################################ утилиты ##########
 
 
@@ -195,6 +482,25 @@ def _collide_circle(left, right):
     return left.distance_to(right) <= left.radius + right.radius
 
 
+def _grounds_cell_size(grounds):
+    """
+        Grid cell size for tanks - any pair for collision or radar
+        check must be in the neighbouring cells
+    """
+    max_radius = max([obj.radius for obj in grounds] or [0])
+    return max(constants.tank_radar_range, 2 * max_radius)
+
+
+def _shots_cell_size(grounds, shots):
+    """
+        Grid cell size for shots - any shot that can hit the tank
+        must be in the neighbouring cells
+    """
+    max_ground_radius = max([obj.radius for obj in grounds] or [0])
+    max_shot_radius = max([obj.radius for obj in shots] or [0])
+    return max(max_ground_radius + max_shot_radius, 1)
+
+
 def _overlapped(left, right):
     """
         Is two objects overlapped
@@ -202,44 +508,8 @@ def _overlapped(left, right):
     return int((left.radius + right.radius) - left.distance_to(right))
 
 
-_half_tank_radar_angle = constants.tank_radar_angle // 2
-_radar_point_back_distance = math.sin(_half_tank_radar_angle / 180 * math.pi) \
-                                * objects.Tank.radius
-
-
 def _in_radar_fork(obj, target):
     """
         Is target in radar beam?
     """
-    point_back_vector = geometry.Vector(obj.course + 180,
-                                        _radar_point_back_distance)
-    point_back = geometry.Point(obj.coord)
-    point_back.add(point_back_vector)
-
-    dx = target.coord.x - point_back.x
-    dy = target.coord.y - point_back.y
-
-    left_radar_angle = geometry.normalise_angle(obj.course
-                                                  + _half_tank_radar_angle)
-    right_radar_angle = geometry.normalise_angle(obj.course
-                                                   - _half_tank_radar_angle)
-
-    target_direction = geometry.get_arctan(dy, dx)
-    obj.debug("course %s dx %s dy %s", obj.course, dx, dy)
-    obj.debug("left_angle %s right_angle %s target_direction %s",
-              left_radar_angle, right_radar_angle, target_direction)
-
-    if right_radar_angle < target_direction < left_radar_angle:
-        obj.debug("in radar beam")
-        return True
-    if 0 + constants.tank_radar_angle > left_radar_angle and \
-       right_radar_angle > 360 - constants.tank_radar_angle:
-        obj.debug("radar beam near zero")
-        if target_direction < left_radar_angle:
-            obj.debug("target_direction < left_radar_angle")
-            return True
-        if target_direction > right_radar_angle:
-            obj.debug("target_direction > right_radar_angle")
-            return True
-
-    return False
+    return radar.RadarBeam(obj).contains(target)
@@ -1,6 +1,8 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
+from collections import deque
+
 
 class GameEvent:
     """
@@ -13,6 +15,14 @@ class GameEvent:
     def get_event_objects(self):
         return self._event_objs
 
+    def coalesce_key(self):
+        """
+            Events with the same key are duplicates - only the first one
+            of them is handled in the tick. None - never coalesce,
+            every event is handled (hits, kills and so on)
+        """
+        return None
+
 
 class EventBorn(GameEvent):
 
@@ -25,6 +35,9 @@ class EventStopped(GameEvent):
     def handle(self, obj):
         obj.stopped()
 
+    def coalesce_key(self):
+        return self.__class__
+
 
 class EventStoppedAtTargetPoint(GameEvent):
 
@@ -43,6 +56,10 @@ class EventCollide(GameEvent):
     def handle(self, obj):
         obj.collided_with(self._event_objs)
 
+    def coalesce_key(self):
+        # с разными танками - разные столкновения
+        return self.__class__, self._event_objs.id
+
 
 class EventHit(GameEvent):
 
@@ -61,8 +78,100 @@ class EventRadarRange(GameEvent):
     def handle(self, obj):
         obj.in_tank_radar_range(self._event_objs)
 
+    def coalesce_key(self):
+        return self.__class__
+
+
+class EventEnteredRadarRange(GameEvent):
+
+    def handle(self, obj):
+        obj.entered_tank_radar_range(self._event_objs)
+
+
+class EventLeftRadarRange(GameEvent):
+
+    def handle(self, obj):
+        obj.left_tank_radar_range(self._event_objs)
+
 
 class EventHearbeat(GameEvent):
 
     def handle(self, obj):
         obj.hearbeat()
+
+    def coalesce_key(self):
+        return self.__class__
+
+
+# события без параметров не меняются - хватит одного экземпляра на всех
+born_event = EventBorn()
+stopped_event = EventStopped()
+gun_reloaded_event = EventGunReloaded()
+hit_event = EventHit()
+target_destroyed_event = EventTargetDestroyed()
+hearbeat_event = EventHearbeat()
+
+
+class EventQueue(deque):
+    """
+        Events of the object with the keys of posted ones
+    """
+
+    def __init__(self):
+        deque.__init__(self)
+        self.keys = set()
+
+
+class EventDispatcher:
+    """
+        Events dispatcher of the scene. Events of every object are
+        collected in its deque during the game tick and handled
+        by one batch when the object's turn comes. The engine is
+        single-threaded - no locks needed.
+        If <coalesce> - duplicates of the event (see GameEvent.coalesce_key)
+        are dropped till the end of the batch
+    """
+
+    def __init__(self, coalesce=True):
+        self.coalesce = coalesce
+
+    def new_queue(self):
+        """
+            Make empty events queue for the new object
+        """
+        return EventQueue()
+
+    def post(self, obj, event):
+        """
+            Put <event> to the queue of <obj>
+        """
+        events = obj._events
+        if self.coalesce:
+            key = event.coalesce_key()
+            if key is not None:
+                if key in events.keys:
+                    return
+                events.keys.add(key)
+        events.append(event)
+
+    def take(self, obj):
+        """
+            Remove all events of <obj> from its queue and return them -
+            for handling in the other place
+        """
+        events = obj._events
+        taken = list(events)
+        events.clear()
+        events.keys.clear()
+        return taken
+
+    def dispatch(self, obj):
+        """
+            Handle all events of <obj> in the order of posting,
+            including events posted by the handlers
+        """
+        events = obj._events
+        while events:
+            events.popleft().handle(obj)
+        # пачка обработана - следующие события уже не дубликаты
+        events.keys.clear()
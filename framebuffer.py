@@ -0,0 +1,79 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import ctypes
+import struct
+from multiprocessing.sharedctypes import RawArray
+
+import constants
+import protocol
+
+# номер последнего записанного кадра
+_header = struct.Struct('<Q')
+# номер кадра в слоте (нечетный - идет запись) и длина данных
+_slot_header = struct.Struct('<QI')
+
+
+class FrameBuffer:
+    """
+        Ring of frames in the shared memory between engine and UI processes.
+        Frame is the packed dynamic fields of all objects (see protocol).
+        Engine writes frames, UI reads the latest complete one, checking
+        frame sequence numbers - it never waits and never reads stale frames
+    """
+
+    def __init__(self, slots=constants.frame_buffer_slots,
+                 slot_size=constants.frame_buffer_slot_size):
+        self.slots = slots
+        self.slot_size = slot_size
+        self._slot_step = _slot_header.size + slot_size
+        self._memory = RawArray(ctypes.c_char,
+                                _header.size + slots * self._slot_step)
+        self._sequence = 0
+        self._read_sequence = 0
+
+    def _slot_offset(self, sequence):
+        return _header.size + (sequence % self.slots) * self._slot_step
+
+    def write(self, packed):
+        """
+            Publish new frame. Returns False if frame is too big for a slot
+        """
+        size = len(packed)
+        if size > self.slot_size:
+            return False
+        sequence = self._sequence + 1
+        offset = self._slot_offset(sequence)
+        # нечетный номер - читатель увидит что слот пишется
+        _slot_header.pack_into(self._memory, offset, 2 * sequence - 1, size)
+        ctypes.memmove(ctypes.addressof(self._memory)
+                       + offset + _slot_header.size,
+                       packed, size)
+        _slot_header.pack_into(self._memory, offset, 2 * sequence, size)
+        _header.pack_into(self._memory, 0, sequence)
+        self._sequence = sequence
+        return True
+
+    def read_latest(self):
+        """
+            Records of the latest complete frame, not read before -
+            list of (id, x, y, course, armor, gun_heat, detected_by_ids).
+            Returns None if there is no new complete frame
+        """
+        sequence = _header.unpack_from(self._memory, 0)[0]
+        if sequence == self._read_sequence:
+            return None
+        offset = self._slot_offset(sequence)
+        slot_sequence, size = _slot_header.unpack_from(self._memory, offset)
+        if slot_sequence != 2 * sequence:
+            # слот уже перезаписывается следующим кадром
+            return None
+        data_offset = offset + _slot_header.size
+        records = list(protocol.unpack_records(self._memory, data_offset,
+                                               data_offset + size))
+        slot_sequence = _slot_header.unpack_from(self._memory, offset)[0]
+        if slot_sequence != 2 * sequence:
+            # пока читали - слот перезаписали, кадр испорчен
+            return None
+        self._read_sequence = sequence
+        return records
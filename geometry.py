@@ -28,6 +28,30 @@ def get_arctan(dy, dx):
     return normalise_angle(out)
 
 
+def _make_polar_table(first, last):
+    table = {}
+    for degrees in range(first, last):
+        radians = (degrees * math.pi) / 180
+        table[degrees] = (math.cos(radians), math.sin(radians))
+    return table
+
+# косинусы и синусы целых углов - курсы меняются с шагом в целый градус.
+# Значения те же, что дает math для этих углов, результаты не меняются.
+# Ненормализованные углы тоже попадают: курс + 180, курс + угол взрыва
+_polar_table = _make_polar_table(-360, 720)
+
+
+def cos_sin(angle):
+    """
+        Cosine and sine of the angle in degrees.
+        Integral angles are taken from the precomputed table
+    """
+    if angle in _polar_table:
+        return _polar_table[angle]
+    radians = (angle * math.pi) / 180
+    return math.cos(radians), math.sin(radians)
+
+
 def get_tangens(angle):
     """
         Determine the tangent of the angle in degrees
@@ -35,34 +59,57 @@ def get_tangens(angle):
     return math.tan(angle / 180.0 * math.pi)
 
 
-class Point():
+class Point(object):
     """
         Screen point
     """
+    __slots__ = ('x', 'y')
 
     def __init__(self, arg1, arg2=None):
         """
             Create a point. You can create from a different point,
-            from the list/tuple or of the specific coordinates
+            from the list/tuple or of the specific coordinates.
+            Point.from_xy is faster if coordinates are known
         """
-        if hasattr(arg1, 'coord'):
+        if arg2 is not None:
+            # просто две координаты
+            self.x, self.y = arg1, arg2
+        elif isinstance(arg1, Point):
+            self.x = arg1.x
+            self.y = arg1.y
+        elif hasattr(arg1, 'coord'):
             # у объекта есть координата (типа Point)
             self.x = arg1.coord.x
             self.y = arg1.coord.y
         elif hasattr(arg1, 'x'):
-            # у объекта есть атрибуты x и y (это Point)
+            # у объекта есть атрибуты x и y
             self.x = arg1.x
             self.y = arg1.y
         elif type(arg1) == type([]) or type(arg1) == type(()):
             # список/тюпл координат
             self.x, self.y = arg1
         elif type(arg1) == type(42) or type(arg1) == type(27.0):
-            # просто две координаты
             self.x, self.y = arg1, arg2
         else:
             raise Exception(self.__init__.__doc__)
         #~ log.debug(str(self))
 
+    @classmethod
+    def from_xy(cls, x, y):
+        """
+            Make point from coordinates
+        """
+        point = object.__new__(cls)
+        point.x = x
+        point.y = y
+        return point
+
+    def __getstate__(self):
+        return self.x, self.y
+
+    def __setstate__(self, state):
+        self.x, self.y = state
+
     def to_screen(self):
         """
             Convert coordinates to display
@@ -80,10 +127,9 @@ class Point():
         """
             Addition of point operand
         """
-        if vector.__class__ != Vector:
+        if not isinstance(vector, Vector):
             raise Exception('point will add only vector')
-        return Point(self.x + vector.dx,
-                       self.y + vector.dy)
+        return Point.from_xy(self.x + vector.dx, self.y + vector.dy)
 
     def sub(self, vector):
         """
@@ -96,10 +142,9 @@ class Point():
         """
             Vector subtraction from the point operand
         """
-        if vector.__class__ != Vector:
+        if not isinstance(vector, Vector):
             raise Exception('point will sub only vector')
-        return Point(self.x - vector.dx,
-                       self.y - vector.dy)
+        return Point.from_xy(self.x - vector.dx, self.y - vector.dy)
 
     def distance_to(self, point2):
         """
@@ -142,69 +187,94 @@ class Point():
         return 0
 
 
-class Vector():
+class Vector(object):
     """
-        Mathematical vector
+        Mathematical vector. Angle and module are computed
+        at the first access, if they was not known at the making
     """
+    __slots__ = ('dx', 'dy', '_angle', '_module')
 
     def __init__(self, arg1, arg2, arg3=None):
         """
             Make vector from:
             Points/game objects - from point arg1 to point arg2
                 (with module arg3)
-            Numbers - with angle arg1 and module arg2
+            Numbers - with angle arg1 and module arg2.
+            Vector.from_polar, Vector.between and Vector.from_xy are
+            faster if the kind of arguments is known
         """
-        self.dx, self.dy, self.angle = 0, 0, None
-
         if hasattr(arg1, 'x') or hasattr(arg1, 'coord'):  # Point or GameObject
             if hasattr(arg1, 'x'):
                 point1, point2 = arg1, arg2
             else:
                 point1, point2 = arg1.coord, arg2.coord
-            self.dx = float(point2.x - point1.x)
-            self.dy = float(point2.y - point1.y)
-            self._determine_module()
-            self._determine_angle()
-            if not (arg3 is None):  # указан модуль - ограничиваем
-                module = arg3
-                if self.module:
-                    self.dx *= module / self.module
-                    self.dy *= module / self.module
-                self.module = module
+            self._set_between(point1, point2, arg3)
         elif arg1.__class__ == int or arg1.__class__ == float or \
              arg2.__class__ == int or arg2.__class__ == float:
-            direction, module = arg1, arg2
-            direction_rad = (direction * math.pi) / 180
-            self.dx = math.cos(direction_rad) * module
-            self.dy = math.sin(direction_rad) * module
-            self.angle = normalise_angle(direction)
-            self.module = module
+            self._set_polar(arg1, arg2)
         else:
             raise Exception(Vector.__init__.__doc__)
 
-    def add(self, vector2):
+    def _set_polar(self, direction, module):
+        cos, sin = cos_sin(direction)
+        self.dx = cos * module
+        self.dy = sin * module
+        self._angle = normalise_angle(direction)
+        self._module = module
+
+    def _set_between(self, point1, point2, module):
+        self.dx = float(point2.x - point1.x)
+        self.dy = float(point2.y - point1.y)
+        if module is None:
+            self._angle = self._module = None
+            return
+        # угол - до изменения длины, нулевой вектор его не теряет
+        self._angle = self._get_angle()
+        length = self._get_module()
+        if length:
+            self.dx *= module / length
+            self.dy *= module / length
+        self._module = module
+
+    @classmethod
+    def from_xy(cls, dx, dy):
         """
-            Composition of vectors
+            Make vector from its projections
         """
-        self.dx += vector2.dx
-        self.dy += vector2.dy
-        self._determine_module()
-        self._determine_angle()
+        vector = object.__new__(cls)
+        vector.dx = dx
+        vector.dy = dy
+        vector._angle = vector._module = None
+        return vector
+
+    @classmethod
+    def from_polar(cls, direction, module):
+        """
+            Make vector with angle <direction> in degrees and <module>
+        """
+        vector = object.__new__(cls)
+        vector._set_polar(direction, module)
+        return vector
 
-    def mul(self, raz):
+    @classmethod
+    def between(cls, point1, point2, module=None):
         """
-            Vector-number multiplication
+            Make vector from <point1> to <point2> (with <module>)
         """
-        self.dx *= raz
-        self.dy *= raz
-        self._determine_module()
-        self._determine_angle()
+        vector = object.__new__(cls)
+        vector._set_between(point1, point2, module)
+        return vector
+
+    def __getstate__(self):
+        return self.dx, self.dy, self._angle, self._module
 
-    def _determine_module(self):
-        self.module = math.sqrt(self.dx ** 2 + self.dy ** 2)
+    def __setstate__(self, state):
+        self.dx, self.dy, self._angle, self._module = state
 
-    def _determine_angle(self):
-        self.angle = 0
+    def _get_module(self):
+        return math.sqrt(self.dx ** 2 + self.dy ** 2)
+
+    def _get_angle(self):
         if self.dx == 0:
             if self.dy >= 0:
                 a = 90
@@ -214,7 +284,43 @@ class Vector():
             a = math.atan(self.dy / self.dx) * (180 / math.pi)
             if self.dx < 0:
                 a += 180
-        self.angle = normalise_angle(a)
+        return normalise_angle(a)
+
+    def _angle_property(self):
+        if self._angle is None:
+            self._angle = self._get_angle()
+        return self._angle
+
+    def _set_angle(self, angle):
+        self._angle = angle
+
+    angle = property(_angle_property, _set_angle)
+
+    def _module_property(self):
+        if self._module is None:
+            self._module = self._get_module()
+        return self._module
+
+    def _set_module(self, module):
+        self._module = module
+
+    module = property(_module_property, _set_module)
+
+    def add(self, vector2):
+        """
+            Composition of vectors
+        """
+        self.dx += vector2.dx
+        self.dy += vector2.dy
+        self._angle = self._module = None
+
+    def mul(self, raz):
+        """
+            Vector-number multiplication
+        """
+        self.dx *= raz
+        self.dy *= raz
+        self._angle = self._module = None
 
     def __str__(self):
         return 'v(dx=%.2f dy=%.2f a=%.2f m=%.2f)' \
@@ -1,16 +1,17 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
-from Queue import Queue
 from random import randint
 
+import common
 from common import log, random_point
 from constants import (tank_speed, tank_turn_speed,
                        field_width, field_height, tank_gun_heat_after_fire,
                        tank_max_armor, tank_armor_renewal_rate, shot_speed,
                        shot_life, shot_power)
-from events import (EventHearbeat, EventStoppedAtTargetPoint, EventStopped,
-                    EventGunReloaded, EventBorn, EventTargetDestroyed, EventHit)
+from events import (EventStoppedAtTargetPoint, hearbeat_event, stopped_event,
+                    gun_reloaded_event, born_event, target_destroyed_event,
+                    hit_event)
 from geometry import Point, Vector, normalise_angle
 import user_interface
 
@@ -24,36 +25,46 @@ class GameObject():
     states = ['stopped', 'turning', 'moving']
     container = None
     _animated = True
+    _debug_by_selection = False
+    # физика на массивах, инициализируется в Scene
+    _physics = None
+    _slot = None
+    # диспетчер событий, инициализируется в Scene
+    _dispatcher = None
+    # процесс команды, если код робота изолирован (см. sandbox)
+    _sandbox = None
 
     def __init__(self, pos, revolvable=True, angle=None):
         self.coord = Point(pos)
-        self.target_coord = Point(0, 0)
+        self.target_coord = Point.from_xy(0, 0)
 
         if angle is None:
             angle = randint(0, 360)
-        self.vector = Vector(angle, 0)
+        self.vector = Vector.from_polar(angle, 0)
         self.course = self.vector.angle
         self.shot = False
         self._revolvable = revolvable
         self.load_value = 0
-        self._distance_cache = {}
-        self._events = Queue()
         self._selected = False
         self._state = 'stopped'
         self._need_moving = False
 
-        # container - это список обьектов игры по типам,
+        # container - это реестр обьектов игры по типам,
         # инициализируется в Scene
         if self.container is None:
             raise Exception("You must create robopycode.engine.Scene"
                             " instance at first!")
-        self.container.append(self)
+        self._events = self._dispatcher.new_queue()
 
         GameObject._objects_count += 1
         self.id = GameObject._objects_count
-        self.debug('born %s', self)
+        self.container.add(self)
+        self.debug('born x=%.1f y=%.1f cour=%.1f %s', self.coord.x,
+                   self.coord.y, self.course, self._state)
 
         self._heartbeat_tics = 5
+        if self._physics is not None:
+            self._physics.register(self)
 
     def __str__(self):
         return 'obj(%s, %s %s cour=%.1f %s)' \
@@ -65,14 +76,15 @@ class GameObject():
 
     def debug(self, pattern, *args):
         """
-            Show debug information if DEBUG mode
+            Record debug information if DEBUG mode, see common.Logger
         """
-        if isinstance(self, Tank):
+        if not common._debug:
+            return
+        if self._debug_by_selection:
             if self._selected:
-                log.debug('%s:%s' % (self.id, pattern), *args)
+                log.record(self.id, None, pattern, args)
         else:
-            log.debug('%s:%s:%s' % (self.__class__.__name__,
-                                           self.id, pattern), *args)
+            log.record(self.id, self.__class__.__name__, pattern, args)
 
     def _need_turning(self):
         return self._revolvable and int(self.course) != int(self.vector.angle)
@@ -81,15 +93,19 @@ class GameObject():
         """
             Turn to the subject / in that direction
         """
-        if isinstance(arg1, GameObject) or arg1.__class__ == Point:
-            self.vector = Vector(self, arg1, 0)
+        if isinstance(arg1, GameObject):
+            self.vector = Vector.between(self.coord, arg1.coord, 0)
+        elif isinstance(arg1, Point):
+            self.vector = Vector.between(self.coord, arg1, 0)
         elif arg1.__class__ == int or arg1.__class__ == float:
             direction = arg1
-            self.vector = Vector(direction, 0)
+            self.vector = Vector.from_polar(direction, 0)
         else:
             raise Exception("use GameObject.turn_to(GameObject/Point "
                             "or Angle). Your pass %s" % arg1)
         self._state = 'turning'
+        if self._slot is not None:
+            self._physics.load(self)
 
     def move(self, direction, speed=3):
         """
@@ -97,13 +113,15 @@ class GameObject():
         """
         if speed > tank_speed:
             speed = tank_speed
-        self.vector = Vector(direction, speed)
+        self.vector = Vector.from_polar(direction, speed)
         self.target_coord = self.coord + self.vector * 100  # далеко-далеко...
         self._need_moving = True
         if self._need_turning():
             self._state = 'turning'
         else:
             self._state = 'moving'
+        if self._slot is not None:
+            self._physics.load(self)
 
     def move_at(self, target, speed=3):
         """
@@ -112,7 +130,7 @@ class GameObject():
         """
         if type(target) in (type(()), type([])):
             target = Point(target)
-        elif target.__class__ == Point:
+        elif isinstance(target, Point):
             pass
         elif isinstance(target, GameObject):
             target = target.coord
@@ -122,12 +140,14 @@ class GameObject():
         if speed > tank_speed:
             speed = tank_speed
         self.target_coord = target
-        self.vector = Vector(self.coord, self.target_coord, speed)
+        self.vector = Vector.between(self.coord, self.target_coord, speed)
         self._need_moving = True
         if self._need_turning():
             self._state = 'turning'
         else:
             self._state = 'moving'
+        if self._slot is not None:
+            self._physics.load(self)
 
     def stop(self):
         """
@@ -135,13 +155,20 @@ class GameObject():
         """
         self._state = 'stopped'
         self._need_moving = False
-        self._events.put(EventStopped())
+        self._dispatcher.post(self, stopped_event)
+        if self._slot is not None:
+            self._physics.load(self)
 
     def _game_step(self):
         """
-            Proceed one game step - do turns, movements and boundary check
+            Proceed one game step - do turns, movements and boundary check.
+            Objects under array physics are moved by Scene all at once
         """
-        self.debug('obj step %s', self)
+        if self._slot is not None:
+            return
+        if common._debug:
+            self.debug('obj step x=%.1f y=%.1f cour=%.1f %s', self.coord.x,
+                       self.coord.y, self.course, self._state)
         if self._revolvable and self._state == 'turning':
             delta = self.vector.angle - self.course
             if abs(delta) < tank_turn_speed:
@@ -150,7 +177,7 @@ class GameObject():
                     self._state = 'moving'
                 else:
                     self._state = 'stopped'
-                    self._events.put(EventStopped())
+                    self._dispatcher.post(self, stopped_event)
             else:
                 if -180 < delta < 0 or delta > 180:
                     self.course -= tank_turn_speed
@@ -162,7 +189,7 @@ class GameObject():
             self.coord.add(self.vector)
             if self.coord.near(self.target_coord):
                 self.stop()
-                self._events.put(EventStoppedAtTargetPoint(
+                self._dispatcher.post(self, EventStoppedAtTargetPoint(
                     self.target_coord))
         # boundary_check
         left_ro = self._runout(self.coord.x)
@@ -184,9 +211,9 @@ class GameObject():
 
         self._heartbeat_tics -= 1
         if not self._heartbeat_tics:
-            event = EventHearbeat()
-            self._events.put(event)
-            self.hearbeat()
+            self._dispatcher.post(self, hearbeat_event)
+            if self._sandbox is None:
+                self.hearbeat()
             self._heartbeat_tics = 5
 
     def _runout(self, coordinate, hight_bound=None):
@@ -207,7 +234,7 @@ class GameObject():
         """
         if isinstance(obj, GameObject):  # и для порожденных классов
             return self.coord.distance_to(obj.coord)
-        if obj.__class__ == Point:
+        if isinstance(obj, Point):
             return self.coord.distance_to(obj)
         raise Exception("GameObject.distance_to: obj %s "
                         "must be GameObject or Point!" % (obj,))
@@ -219,9 +246,7 @@ class GameObject():
         return self.distance_to(obj) <= radius
 
     def _proceed_events(self):
-        while not self._events.empty():
-            event = self._events.get()
-            event.handle(self)
+        self._dispatcher.dispatch(self)
 
     def stopped(self):
         """
@@ -258,7 +283,7 @@ class Gun:
             self.heat -= 1
             if not self.heat:
                 # перезарядка только что кончилась
-                self.owner._events.put(EventGunReloaded())
+                self.owner._dispatcher.post(self.owner, gun_reloaded_event)
                 self._state = 'loaded'
 
     def fire(self):
@@ -266,9 +291,10 @@ class Gun:
             Fire from gun
         """
         if self._state == 'loaded':
-            start_point = Point(self.owner.coord) + \
-                          Vector(self.owner.course,
-                                          self.owner.radius // 2 + 12)
+            owner_coord = self.owner.coord
+            start_point = Point.from_xy(owner_coord.x, owner_coord.y) + \
+                          Vector.from_polar(self.owner.course,
+                                            self.owner.radius // 2 + 12)
             shot = Shot(pos=start_point, direction=self.owner.course)
             self.heat = tank_gun_heat_after_fire
             self._state = 'reloading'
@@ -280,10 +306,14 @@ class Tank(GameObject):
         Tank. May ride on the screen.
     """
     _selectable = True  # обьект можно выделить мышкой
+    _debug_by_selection = True  # отладка только выделенных танков
 
     _img_file_name = 'tank_blue.png'
     _layer = 2
     radius = 32  # collision detect
+    # True - события радара только когда меняется набор видимых обьектов
+    radar_changes_only = False
+    _radar_known_objs = ()
 
     def __init__(self, pos=None, angle=None):
         """
@@ -294,8 +324,10 @@ class Tank(GameObject):
         GameObject.__init__(self, pos, angle=angle)
         self.gun = Gun(self)
         self._armor = float(tank_max_armor)
+        self._damage_dealt = 0
+        self._damage_taken = 0
         self.explosion = None
-        self._events.put(EventBorn())
+        self._dispatcher.post(self, born_event)
 
     @property
     def armor(self):
@@ -320,15 +352,22 @@ class Tank(GameObject):
             Renew exploison at the armor - it must moving with as
         """
         if self.explosion:
-            self.explosion.coord = Point(self.coord)
-            self.debug("tank course %s explosion.vector.angle %s "
-                       "explosion.coord %s", self.course,
-                       self.explosion.vector.angle, self.explosion.coord)
-            expl_shift = Vector(self.course
-                                         + self.explosion.vector.angle,
-                                         self.explosion.vector.module)
-            self.explosion.coord.add(expl_shift)
-            self.debug("after add explosion is %s", self.explosion)
+            # координата взрыва может быть связана с физикой - не заменяем
+            explosion_coord = self.explosion.coord
+            explosion_coord.x, explosion_coord.y = self.coord.x, self.coord.y
+            if common._debug:
+                self.debug("tank course %s explosion.vector.angle %s "
+                           "explosion.coord x=%.1f y=%.1f", self.course,
+                           self.explosion.vector.angle,
+                           explosion_coord.x, explosion_coord.y)
+            expl_shift = Vector.from_polar(self.course
+                                           + self.explosion.vector.angle,
+                                           self.explosion.vector.module)
+            explosion_coord.add(expl_shift)
+            if common._debug:
+                self.debug("after add explosion %s is at x=%.1f y=%.1f",
+                           self.explosion.id, explosion_coord.x,
+                           explosion_coord.y)
 
     def fire(self):
         """
@@ -352,10 +391,14 @@ class Tank(GameObject):
             Contact with our tank shell
         """
         self._armor -= shot.power
-        self._events.put(EventHit())
+        self._damage_taken += shot.power
+        if shot.owner:
+            shot.owner._damage_dealt += shot.power
+        self._dispatcher.post(self, hit_event)
         if self._armor <= 0:
             if shot.owner:  # еще не был убит
-                shot.owner._events.put(EventTargetDestroyed())
+                shot.owner._dispatcher.post(shot.owner,
+                                            target_destroyed_event)
             self.detonate()
 
     def born(self):
@@ -406,6 +449,20 @@ class Tank(GameObject):
         """
         pass
 
+    def entered_tank_radar_range(self, objects):
+        """
+            Event: objects appeared in the radar beam
+            (only if radar_changes_only)
+        """
+        pass
+
+    def left_tank_radar_range(self, objects):
+        """
+            Event: objects disappeared from the radar beam
+            (only if radar_changes_only)
+        """
+        pass
+
 
 class StaticTarget(Tank):
     """
@@ -482,7 +539,9 @@ class Shot(GameObject):
             self.owner = None
 
     def _game_step(self):
-        self.debug('%s', self)
+        if common._debug:
+            self.debug('shot step x=%.1f y=%.1f life=%s %s', self.coord.x,
+                       self.coord.y, self.life, self._state)
         self.life -= 1
         if not self.life or not self._state == 'moving':
             self.owner.shot = None
@@ -506,7 +565,7 @@ class Explosion(GameObject):
 
     def __init__(self, explosion_coord, hitted_obj):
         GameObject.__init__(self, explosion_coord, revolvable=False)
-        self.vector = Vector(hitted_obj.coord, explosion_coord)
+        self.vector = Vector.between(hitted_obj.coord, explosion_coord)
         self.vector.angle -= hitted_obj.course  # смещение при отображении
         self.owner = hitted_obj
         self.owner.explosion = self
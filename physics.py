@@ -0,0 +1,249 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from constants import tank_turn_speed, field_width, field_height
+from events import stopped_event, EventStoppedAtTargetPoint, hearbeat_event
+from geometry import Point
+
+_STOPPED, _TURNING, _MOVING = 0, 1, 2
+_state_codes = {'stopped': _STOPPED, 'turning': _TURNING, 'moving': _MOVING}
+_state_names = ('stopped', 'turning', 'moving')
+_heartbeat_tics = 5
+
+
+class ArrayPoint(Point):
+    """
+        Point which coordinates are stored in the physics arrays
+    """
+    __slots__ = ('_physics', '_slot')
+
+    def __init__(self, physics, slot):
+        self._physics = physics
+        self._slot = slot
+
+    def _get_x(self):
+        return float(self._physics.coords[self._slot, 0])
+
+    def _set_x(self, value):
+        self._physics.coords[self._slot, 0] = value
+
+    def _get_y(self):
+        return float(self._physics.coords[self._slot, 1])
+
+    def _set_y(self, value):
+        self._physics.coords[self._slot, 1] = value
+
+    x = property(_get_x, _set_x)
+    y = property(_get_y, _set_y)
+
+    def __reduce__(self):
+        # в другой процесс уходит обычная точка
+        return Point, (self.x, self.y)
+
+
+class ArrayPhysics:
+    """
+        Struct-of-arrays physics backend. Coordinates, courses, vectors,
+        states and radii of all game objects are kept in numpy arrays
+        and advanced by a few vectorized operations per game tick
+    """
+
+    def __init__(self, capacity=256):
+        if numpy is None:
+            raise Exception("ArrayPhysics needs numpy, please install it")
+        self._objects = []
+        self._free_slots = []
+        self.coords = numpy.zeros((0, 2))
+        self.targets = numpy.zeros((0, 2))
+        self.target_slots = numpy.zeros(0, dtype=int)
+        self.vectors = numpy.zeros((0, 2))
+        self.angles = numpy.zeros(0)
+        self.courses = numpy.zeros(0)
+        self.radii = numpy.zeros(0)
+        self.states = numpy.zeros(0, dtype=numpy.int8)
+        self.need_moving = numpy.zeros(0, dtype=bool)
+        self.revolvable = numpy.zeros(0, dtype=bool)
+        self.heartbeats = numpy.zeros(0, dtype=int)
+        self.registered = numpy.zeros(0, dtype=bool)
+        self._grow(capacity)
+
+    def _grow(self, capacity):
+        """
+            Make arrays bigger, old values are kept
+        """
+        def grown(array):
+            new_array = numpy.zeros((capacity,) + array.shape[1:],
+                                    dtype=array.dtype)
+            new_array[:len(array)] = array
+            return new_array
+
+        old_capacity = len(self._objects)
+        for name in ('coords', 'targets', 'target_slots', 'vectors',
+                     'angles', 'courses', 'radii', 'states', 'need_moving',
+                     'revolvable', 'heartbeats', 'registered'):
+            setattr(self, name, grown(getattr(self, name)))
+        self.target_slots[old_capacity:] = -1
+        self._objects += [None] * (capacity - old_capacity)
+        self._free_slots += range(capacity - 1, old_capacity - 1, -1)
+
+    def register(self, obj):
+        """
+            Take object under control - its coord become view into arrays
+        """
+        if not self._free_slots:
+            self._grow(len(self._objects) * 2)
+        slot = self._free_slots.pop()
+        self._objects[slot] = obj
+        self.coords[slot] = obj.coord.x, obj.coord.y
+        self.radii[slot] = obj.radius
+        self.revolvable[slot] = obj._revolvable
+        self.heartbeats[slot] = _heartbeat_tics
+        self.registered[slot] = True
+        obj._slot = slot
+        obj.coord = ArrayPoint(self, slot)
+        self.load(obj)
+
+    def release(self, obj):
+        """
+            Object leaves the game - give back its coord and slot
+        """
+        slot = obj._slot
+        obj.coord = Point(obj.coord.x, obj.coord.y)
+        obj._slot = None
+        self._objects[slot] = None
+        self.registered[slot] = False
+        # свободный слот никого не догоняет
+        self.target_slots[slot] = -1
+        self._free_slots.append(slot)
+        # кто ехал к этому объекту - едет к месту где он был.
+        # Слот займет другой объект - его точку у них заменяем
+        x, y = self.coords[slot]
+        for follower_slot in numpy.flatnonzero(self.target_slots == slot):
+            self._objects[follower_slot].target_coord = Point.from_xy(
+                float(x), float(y))
+            self.targets[follower_slot] = x, y
+            self.target_slots[follower_slot] = -1
+
+    def load(self, obj):
+        """
+            Object got new orders - copy them to arrays
+        """
+        slot = obj._slot
+        vector = obj.vector
+        self.vectors[slot] = vector.dx, vector.dy
+        self.angles[slot] = vector.angle
+        self.courses[slot] = obj.course
+        self.states[slot] = _state_codes[obj._state]
+        self.need_moving[slot] = obj._need_moving
+        target = obj.target_coord
+        if isinstance(target, ArrayPoint) and target._physics is self:
+            # едем за другим объектом - берем его текущие координаты
+            self.target_slots[slot] = target._slot
+        else:
+            self.target_slots[slot] = -1
+            self.targets[slot] = target.x, target.y
+
+    def step(self, objs):
+        """
+            Proceed one game step for <objs> - do turns, movements and
+            boundary check. Objects which left the game are released
+        """
+        idx = numpy.fromiter([obj._slot for obj in objs], dtype=int,
+                             count=len(objs))
+        live = numpy.zeros(len(self._objects), dtype=bool)
+        live[idx] = True
+        for slot in numpy.flatnonzero(self.registered & ~live):
+            self.release(self._objects[slot])
+        if not objs:
+            return
+
+        old_states = self.states[idx]
+        old_need_moving = self.need_moving[idx]
+        states = old_states.copy()
+        need_moving = old_need_moving.copy()
+        courses = self.courses[idx]
+        angles = self.angles[idx]
+
+        # повороты
+        turning = self.revolvable[idx] & (states == _TURNING)
+        delta = angles - courses
+        turned = turning & (numpy.abs(delta) < tank_turn_speed)
+        rotating = turning & ~turned
+        to_right = ((-180 < delta) & (delta < 0)) | (delta > 180)
+        rotated = courses + numpy.where(to_right,
+                                        -tank_turn_speed, tank_turn_speed)
+        courses = numpy.where(turned, angles, courses)
+        courses = numpy.where(rotating, numpy.remainder(rotated, 360),
+                              courses)
+        states[turned & need_moving] = _MOVING
+        turn_stopped = turned & ~need_moving
+        states[turn_stopped] = _STOPPED
+
+        # движение
+        coords = self.coords[idx]
+        moving = states == _MOVING
+        coords[moving] += self.vectors[idx][moving]
+        targets = self.targets[idx]
+        target_slots = self.target_slots[idx]
+        followers = target_slots >= 0
+        targets[followers] = self.coords[target_slots[followers]]
+        to_target = coords - targets
+        distances = numpy.sqrt(to_target[:, 0] ** 2 + to_target[:, 1] ** 2)
+        at_target = moving & (distances < 5)
+        states[at_target] = _STOPPED
+        need_moving[at_target] = False
+        stops = turn_stopped.astype(int) + at_target
+
+        # boundary check
+        radii = self.radii[idx]
+        for axis, sign, bound in ((0, 1, 0), (1, 1, 0),
+                                  (0, -1, field_width),
+                                  (1, -1, field_height)):
+            if bound:
+                runout = coords[:, axis] - (bound - radii)
+            else:
+                runout = radii - coords[:, axis]
+            out = runout > 0
+            coords[out, axis] += sign * (runout[out] + 1)
+            states[out] = _STOPPED
+            need_moving[out] = False
+            stops += out
+
+        heartbeats = self.heartbeats[idx] - 1
+        beats = heartbeats == 0
+        heartbeats[beats] = _heartbeat_tics
+
+        self.coords[idx] = coords
+        self.courses[idx] = courses
+        self.states[idx] = states
+        self.need_moving[idx] = need_moving
+        self.heartbeats[idx] = heartbeats
+
+        # объекты узнают о переменах только если они были
+        for i in numpy.flatnonzero(turning):
+            objs[i].course = float(courses[i])
+        changed = (states != old_states) | (need_moving != old_need_moving)
+        for i in numpy.flatnonzero(changed):
+            objs[i]._state = _state_names[states[i]]
+            objs[i]._need_moving = bool(need_moving[i])
+        for i in numpy.flatnonzero(stops | beats):
+            obj = objs[i]
+            post = obj._dispatcher.post
+            if turn_stopped[i]:
+                post(obj, stopped_event)
+                stops[i] -= 1
+            if at_target[i]:
+                post(obj, stopped_event)
+                post(obj, EventStoppedAtTargetPoint(obj.target_coord))
+                stops[i] -= 1
+            for j in range(stops[i]):
+                post(obj, stopped_event)
+            if beats[i]:
+                post(obj, hearbeat_event)
+                if obj._sandbox is None:
+                    obj.hearbeat()
@@ -0,0 +1,79 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from collections import deque
+
+import constants
+
+
+def _percentile(sorted_values, share):
+    index = int(round(share * (len(sorted_values) - 1)))
+    return sorted_values[index]
+
+
+class TickStats:
+    """
+        Timings of the game tick phases, can be sent between processes.
+        <phases> - dict phase name -> dict with p50, p99, mean and max
+        times in seconds and count of samples
+    """
+
+    def __init__(self, phases):
+        self.phases = phases
+
+    def __str__(self):
+        return '\n'.join(['%-20s p50=%.3fms p99=%.3fms'
+                          % (name, phase['p50'] * 1000, phase['p99'] * 1000)
+                          for name, phase in sorted(self.phases.items())])
+
+
+class TickProfiler:
+    """
+        Time of the game tick phases. Time is summed for the phase
+        during the tick, the last <samples> ticks are kept
+        for percentiles
+    """
+
+    def __init__(self, samples=constants.profiler_samples):
+        self.samples = samples
+        self._tick = {}
+        self._phases = {}
+
+    def add(self, phase, seconds):
+        """
+            Add time spent in the <phase> during the current tick
+        """
+        self._tick[phase] = self._tick.get(phase, 0.0) + seconds
+
+    def add_sample(self, phase, seconds):
+        """
+            Add the whole sample of the <phase> that is not a part of
+            the game tick (rendering, for example)
+        """
+        if phase not in self._phases:
+            self._phases[phase] = deque(maxlen=self.samples)
+        self._phases[phase].append(seconds)
+
+    def end_tick(self):
+        """
+            Tick is over - its times go to the samples
+        """
+        for phase, seconds in self._tick.iteritems():
+            self.add_sample(phase, seconds)
+        self._tick = {}
+
+    def stats(self):
+        """
+            Percentiles of the phases times - TickStats
+        """
+        phases = {}
+        for phase, samples in self._phases.iteritems():
+            values = sorted(samples)
+            phases[phase] = {
+                'p50': _percentile(values, 0.5),
+                'p99': _percentile(values, 0.99),
+                'mean': sum(values) / len(values),
+                'max': values[-1],
+                'count': len(values),
+            }
+        return TickStats(phases)
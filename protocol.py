@@ -0,0 +1,156 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import struct
+
+from geometry import Point
+
+# id, x, y, course, armor, gun_heat, число обнаруживших
+_record = struct.Struct('<IfffhhH')
+_detected_id = struct.Struct('<I')
+
+
+class ObjectState:
+    """
+        Hold game object state, useful for exchange between processes
+    """
+    params = (
+        'id',
+        'coord',
+        'course',
+        'armor',
+        'gun_heat',
+        '_revolvable',
+        '_img_file_name',
+        '_layer',
+        '_selectable',
+        '_animated'
+        )
+
+    def __init__(self, obj):
+        for param in self.params:
+            if hasattr(obj, param):
+                val = getattr(obj, param)
+                setattr(self, param, val)
+        # своя копия - координаты будут обновляться на месте
+        self.coord = Point(obj.coord)
+        if hasattr(obj, '_detected_by'):
+            self._detected_by = [
+                detected_by_obj.id
+                for detected_by_obj in obj._detected_by
+            ]
+        else:
+            self._detected_by = []
+        self._detected_by_ids = self._detected_by
+
+    def update(self, x, y, course, armor, gun_heat, detected_by_ids):
+        """
+            Renew dynamic fields of the state
+        """
+        self.coord.x, self.coord.y = x, y
+        self.course = course
+        if hasattr(self, 'armor'):
+            self.armor = armor
+        if hasattr(self, 'gun_heat'):
+            self.gun_heat = gun_heat
+        self._detected_by_ids = detected_by_ids
+
+
+class StateDelta:
+    """
+        Changes of game objects states for one game tick:
+        states of born objects, ids of died ones and packed
+        dynamic fields of objects that was changed
+    """
+
+    def __init__(self, spawned, removed, packed):
+        self.spawned = spawned
+        self.removed = removed
+        self.packed = packed
+
+    def __nonzero__(self):
+        return bool(self.spawned or self.removed or self.packed)
+
+    def records(self):
+        """
+            Unpack dynamic fields -
+            (id, x, y, course, armor, gun_heat, detected_by_ids)
+        """
+        return unpack_records(self.packed)
+
+
+def pack_record(obj_id, x, y, course, armor, gun_heat, detected_by_ids):
+    """
+        Pack dynamic fields of object state to the binary string
+    """
+    packed = _record.pack(obj_id, x, y, course, armor, gun_heat,
+                          len(detected_by_ids))
+    if detected_by_ids:
+        packed += struct.pack('<%dI' % len(detected_by_ids),
+                              *detected_by_ids)
+    return packed
+
+
+def unpack_records(packed, offset=0, end=None):
+    """
+        Iterate over packed dynamic fields of objects states
+    """
+    if end is None:
+        end = len(packed)
+    record_size = _record.size
+    while offset < end:
+        obj_id, x, y, course, armor, gun_heat, detected_count = \
+            _record.unpack_from(packed, offset)
+        offset += record_size
+        if detected_count:
+            detected_by_ids = struct.unpack_from('<%dI' % detected_count,
+                                                 packed, offset)
+            offset += detected_count * _detected_id.size
+        else:
+            detected_by_ids = ()
+        yield obj_id, x, y, course, armor, gun_heat, detected_by_ids
+
+
+def dynamic_fields(obj):
+    """
+        Dynamic fields of the game object -
+        (x, y, course, armor, gun_heat, detected_by_ids)
+    """
+    if hasattr(obj, '_detected_by'):
+        detected_by_ids = tuple([detected_by_obj.id
+                                 for detected_by_obj in obj._detected_by])
+    else:
+        detected_by_ids = ()
+    return (obj.coord.x, obj.coord.y, obj.course,
+            getattr(obj, 'armor', 0), getattr(obj, 'gun_heat', 0),
+            detected_by_ids)
+
+
+class StateEncoder:
+    """
+        Make StateDelta from game objects - static attributes are sent
+        once at the object born, then only changed dynamic fields
+    """
+
+    def __init__(self):
+        self._sent = {}
+
+    def encode(self, objs, full=False):
+        """
+            Changes of <objs> states since the last encoding.
+            If <full> - dynamic fields of all old objects are packed
+        """
+        spawned = []
+        packed = []
+        sent = self._sent
+        alive = {}
+        for obj in objs:
+            fields = dynamic_fields(obj)
+            alive[obj.id] = fields
+            if obj.id not in sent:
+                spawned.append(ObjectState(obj))
+            elif full or sent[obj.id] != fields:
+                packed.append(pack_record(obj.id, *fields))
+        removed = [obj_id for obj_id in sent if obj_id not in alive]
+        self._sent = alive
+        return StateDelta(spawned, removed, ''.join(packed))
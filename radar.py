@@ -0,0 +1,106 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import math
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+import constants
+from geometry import normalise_angle, get_arctan, cos_sin
+
+_half_tank_radar_angle = constants.tank_radar_angle // 2
+# в целых числах - тут всегда ноль, вершина луча совпадает с центром танка
+_radar_point_back_factor = math.sin(_half_tank_radar_angle / 180 * math.pi)
+# ближе к краю луча, чем на эту долю расстояния - решаем по углам
+_edge_tolerance = 1e-9
+
+
+class RadarBeam:
+    """
+        Radar beam of the tank at the current game step.
+        Beam edges are computed once, then targets are tested
+        by two dot products with the edges normals - without trigonometry.
+        Apex follows the tank coordinates, so the tank may be moved
+        by collisions between the tests
+    """
+
+    def __init__(self, obj):
+        self.coord = obj.coord
+        back_distance = _radar_point_back_factor * obj.radius
+        back_cos, back_sin = cos_sin(obj.course + 180)
+        self.back_dx = back_cos * back_distance
+        self.back_dy = back_sin * back_distance
+        self.left_angle = normalise_angle(obj.course + _half_tank_radar_angle)
+        self.right_angle = normalise_angle(obj.course - _half_tank_radar_angle)
+        if self.right_angle < self.left_angle:
+            self.blind = False
+        else:
+            # луч переходит через ноль
+            self.blind = not (constants.tank_radar_angle > self.left_angle and
+                              self.right_angle > 360
+                                                 - constants.tank_radar_angle)
+        left_cos, left_sin = cos_sin(self.left_angle)
+        right_cos, right_sin = cos_sin(self.right_angle)
+        # нормали к краям луча, смотрящие внутрь
+        self.left_nx = left_sin
+        self.left_ny = -left_cos
+        self.right_nx = -right_sin
+        self.right_ny = right_cos
+
+    def _angular_contains(self, dx, dy):
+        """
+            Exact angular test - for targets near the beam edges
+        """
+        target_direction = get_arctan(dy, dx)
+        if self.right_angle < target_direction < self.left_angle:
+            return True
+        if self.left_angle <= self.right_angle:
+            return target_direction < self.left_angle or \
+                   target_direction > self.right_angle
+        return False
+
+    def contains(self, target):
+        """
+            Is target in radar beam?
+        """
+        if self.blind:
+            return False
+        dx = target.coord.x - (self.coord.x + self.back_dx)
+        dy = target.coord.y - (self.coord.y + self.back_dy)
+        if not (dx or dy):
+            # направление на саму вершину считаем нулевым
+            dx = 1.0
+        left_dot = self.left_nx * dx + self.left_ny * dy
+        right_dot = self.right_nx * dx + self.right_ny * dy
+        tolerance = _edge_tolerance * (abs(dx) + abs(dy))
+        if abs(left_dot) <= tolerance or abs(right_dot) <= tolerance:
+            return self._angular_contains(dx, dy)
+        return left_dot > 0 and right_dot > 0
+
+    def contains_many(self, xs, ys):
+        """
+            Vectorized test for numpy arrays of targets coordinates.
+            Returns boolean array
+        """
+        if numpy is None:
+            raise Exception('numpy is required for vectorized radar test')
+        xs = numpy.asarray(xs, dtype=float)
+        ys = numpy.asarray(ys, dtype=float)
+        if self.blind:
+            return numpy.zeros(xs.shape, dtype=bool)
+        dx = xs - (self.coord.x + self.back_dx)
+        dy = ys - (self.coord.y + self.back_dy)
+        dx = numpy.where((dx == 0) & (dy == 0), 1.0, dx)
+        left_dot = self.left_nx * dx + self.left_ny * dy
+        right_dot = self.right_nx * dx + self.right_ny * dy
+        result = (left_dot > 0) & (right_dot > 0)
+        tolerance = _edge_tolerance * (numpy.abs(dx) + numpy.abs(dy))
+        near_edge = (numpy.abs(left_dot) <= tolerance) | \
+                    (numpy.abs(right_dot) <= tolerance)
+        for index in numpy.flatnonzero(near_edge):
+            result.flat[index] = self._angular_contains(dx.flat[index],
+                                                        dy.flat[index])
+        return result
@@ -0,0 +1,75 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+
+class ObjectRegistry:
+    """
+        Game objects of one kind in the order of their birth.
+        Objects are added at once, removed objects are dropped at
+        flush() - the engine calls it at the safe points of the game tick,
+        so objects may remove themselves while the registry is iterated.
+        Removed but not flushed objects are not "in" the registry already
+    """
+
+    def __init__(self):
+        self._objs = []
+        self._by_id = {}
+        self._removed = {}
+
+    def __iter__(self):
+        return iter(self._objs)
+
+    def __len__(self):
+        return len(self._objs) - len(self._removed)
+
+    def __nonzero__(self):
+        return len(self._objs) > len(self._removed)
+
+    def __contains__(self, obj):
+        return obj.id in self._by_id and obj.id not in self._removed
+
+    def add(self, obj):
+        """
+            Add the object, it must have the id already
+        """
+        if obj.id in self._by_id:
+            raise Exception('object %s is in the registry already' % obj.id)
+        self._objs.append(obj)
+        self._by_id[obj.id] = obj
+
+    def remove(self, obj):
+        """
+            Mark the object as removed, it is dropped at flush()
+        """
+        if obj.id not in self._by_id:
+            raise Exception('object %s is not in the registry' % obj.id)
+        self._removed[obj.id] = obj
+
+    def get(self, obj_id, default=None):
+        """
+            Object by its id
+        """
+        if obj_id in self._removed:
+            return default
+        return self._by_id.get(obj_id, default)
+
+    def flush(self):
+        """
+            Drop the removed objects
+        """
+        removed = self._removed
+        if not removed:
+            return
+        # один проход по списку на все удаленные за шаг обьекты
+        self._objs = [obj for obj in self._objs if obj.id not in removed]
+        for obj_id in removed:
+            del self._by_id[obj_id]
+        self._removed = {}
+
+    def clear(self):
+        """
+            Drop all objects
+        """
+        self._objs = []
+        self._by_id = {}
+        self._removed = {}
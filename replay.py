@@ -0,0 +1,428 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+    Binary recording of matches and its playback. Record consists of
+    keyframes with all objects states, delta frames with changed ones
+    between them, and index of keyframes at the end for fast seeking.
+    Play record as script (arrows left/right - jump back/forward):
+
+        python replay.py match.rpr
+"""
+
+import bisect
+import mmap
+import struct
+import sys
+import time
+
+import constants
+import protocol
+from geometry import Point
+from user_interface import UserInterface
+
+_file_header = struct.Struct('<8sH')
+_magic = 'ROBOPYRP'
+_version = 2
+
+# тип куска, длина куска
+_chunk_header = struct.Struct('<BI')
+_TYPE_CHUNK = 1
+_KEYFRAME_CHUNK = 2
+_DELTA_CHUNK = 3
+_INDEX_CHUNK = 4
+
+# номер типа, слой, флаги, длина имени картинки
+_type_header = struct.Struct('<HbBH')
+# номер тика, число объектов
+_frame_header = struct.Struct('<II')
+# номер тика, число измененных объектов, число умерших
+_delta_header = struct.Struct('<III')
+# число ключевых кадров, число типов
+_index_header = struct.Struct('<II')
+# номер тика, смещение в файле
+_index_record = struct.Struct('<IQ')
+_type_size = struct.Struct('<H')
+# смещение индекса, метка индекса - в самом конце файла
+_footer = struct.Struct('<Q8s')
+_footer_magic = 'RPINDEX0'
+# id, номер типа, x, y, course, armor, gun_heat
+_object_record = struct.Struct('<IHfffhh')
+
+_type_flags = ('_revolvable', '_selectable', '_animated', 'armor', 'gun_heat')
+
+
+class ObjectType:
+    """
+        Static attributes of recorded objects
+    """
+
+    def __init__(self, type_id, img_file_name, layer, flags):
+        self.type_id = type_id
+        self._img_file_name = img_file_name
+        self._layer = layer
+        self.flags = flags
+        for i, name in enumerate(_type_flags):
+            if name in ('armor', 'gun_heat'):
+                # у объекта такого типа есть этот атрибут
+                if flags & (1 << i):
+                    setattr(self, name, 0)
+            else:
+                setattr(self, name, bool(flags & (1 << i)))
+
+    @classmethod
+    def key_of(cls, obj):
+        """
+            Static attributes of object, identifies its type
+        """
+        flags = 0
+        for i, name in enumerate(_type_flags):
+            if name in ('armor', 'gun_heat'):
+                flag = hasattr(obj, name)
+            else:
+                flag = getattr(obj, name, False)
+            if flag:
+                flags |= 1 << i
+        return obj._img_file_name, obj._layer, flags
+
+    def pack(self):
+        img_file_name = self._img_file_name.encode('utf-8')
+        return _type_header.pack(self.type_id, self._layer, self.flags,
+                                 len(img_file_name)) + img_file_name
+
+    @classmethod
+    def unpack(cls, data):
+        type_id, layer, flags, name_size = _type_header.unpack_from(data)
+        img_file_name = data[_type_header.size:_type_header.size + name_size]
+        return cls(type_id, img_file_name.decode('utf-8'), layer, flags)
+
+
+class _RecordedObject:
+    """
+        Object made from the record, enough for the ObjectState
+    """
+
+    def __init__(self, object_type, record):
+        self.__dict__.update(object_type.__dict__)
+        self.id, type_id, x, y, self.course, armor, gun_heat = record
+        self.coord = Point(x, y)
+        if hasattr(self, 'armor'):
+            self.armor = armor
+        if hasattr(self, 'gun_heat'):
+            self.gun_heat = gun_heat
+
+
+class ReplayRecorder:
+    """
+        Write per tick binary records of game objects to the file
+    """
+
+    def __init__(self, path,
+                 keyframe_interval=constants.replay_keyframe_interval):
+        self._file = open(path, 'wb')
+        self._file.write(_file_header.pack(_magic, _version))
+        self.keyframe_interval = keyframe_interval
+        self._types = {}
+        self._keyframes = []
+        self._last_records = {}
+        self._frames_count = 0
+
+    def _write_chunk(self, kind, payload):
+        self._file.write(_chunk_header.pack(kind, len(payload)))
+        self._file.write(payload)
+
+    def _type_id(self, obj):
+        key = ObjectType.key_of(obj)
+        object_type = self._types.get(key)
+        if object_type is None:
+            # новый тип - записываем его перед кадром
+            object_type = ObjectType(len(self._types), *key)
+            self._types[key] = object_type
+            self._write_chunk(_TYPE_CHUNK, object_type.pack())
+        return object_type.type_id
+
+    def record(self, tick, objs):
+        """
+            Write the frame - states of all <objs> at game <tick>.
+            Every keyframe_interval frame is the keyframe, others
+            hold only changed objects
+        """
+        records = {}
+        ordered_records = []
+        for obj in objs:
+            packed = _object_record.pack(
+                obj.id, self._type_id(obj), obj.coord.x, obj.coord.y,
+                obj.course, getattr(obj, 'armor', 0),
+                getattr(obj, 'gun_heat', 0))
+            records[obj.id] = packed
+            ordered_records.append((obj.id, packed))
+        last_records = self._last_records
+        if self._frames_count % self.keyframe_interval == 0:
+            self._keyframes.append((tick, self._file.tell()))
+            self._write_chunk(_KEYFRAME_CHUNK, ''.join(
+                [_frame_header.pack(tick, len(ordered_records))]
+                + [record for obj_id, record in ordered_records]))
+        else:
+            changed = [record for obj_id, record in ordered_records
+                       if last_records.get(obj_id) != record]
+            removed = [obj_id for obj_id in last_records
+                       if obj_id not in records]
+            self._write_chunk(_DELTA_CHUNK, ''.join(
+                [_delta_header.pack(tick, len(changed), len(removed))]
+                + changed
+                + [struct.pack('<%dI' % len(removed), *removed)]))
+        self._last_records = records
+        self._frames_count += 1
+
+    def close(self):
+        """
+            Write keyframes index and close the file
+        """
+        index_offset = self._file.tell()
+        packed_types = [object_type.pack()
+                        for object_type in self._types.itervalues()]
+        payload = [_index_header.pack(len(self._keyframes),
+                                      len(packed_types))]
+        payload += [_index_record.pack(tick, offset)
+                    for tick, offset in self._keyframes]
+        payload += [_type_size.pack(len(packed)) + packed
+                    for packed in packed_types]
+        self._write_chunk(_INDEX_CHUNK, ''.join(payload))
+        self._file.write(_footer.pack(index_offset, _footer_magic))
+        self._file.close()
+
+
+class ReplayReader:
+    """
+        Read frames of the recorded match. File is memory-mapped,
+        jump to any tick decodes one keyframe and a few delta frames
+    """
+
+    def __init__(self, path):
+        self._file = open(path, 'rb')
+        self._data = mmap.mmap(self._file.fileno(), 0,
+                               access=mmap.ACCESS_READ)
+        magic, version = _file_header.unpack_from(self._data)
+        if magic != _magic or version != _version:
+            raise Exception("%s is not robopycode replay file" % path)
+        self.types = {}
+        self.keyframes = []
+        self._end = len(self._data)
+        if not self._read_index():
+            # запись не была закрыта - индекс строим по файлу
+            self._scan_index()
+        self._keyframe_ticks = [tick for tick, offset in self.keyframes]
+        # состояние на текущий тик: id -> (id, type_id, x, y, course,
+        #                                    armor, gun_heat)
+        self.state = {}
+        self.tick = None
+        self._offset = _file_header.size
+
+    def _read_index(self):
+        data = self._data
+        if len(data) < _file_header.size + _footer.size:
+            return False
+        index_offset, footer_magic = _footer.unpack_from(
+            data, len(data) - _footer.size)
+        if footer_magic != _footer_magic:
+            return False
+        offset = index_offset + _chunk_header.size
+        keyframes_count, types_count = _index_header.unpack_from(data, offset)
+        offset += _index_header.size
+        for i in range(keyframes_count):
+            self.keyframes.append(_index_record.unpack_from(data, offset))
+            offset += _index_record.size
+        for i in range(types_count):
+            size = _type_size.unpack_from(data, offset)[0]
+            offset += _type_size.size
+            self._add_type(data[offset:offset + size])
+            offset += size
+        self._end = index_offset
+        return True
+
+    def _scan_index(self):
+        offset = _file_header.size
+        for kind, payload_offset, size in self._chunks(offset):
+            if kind == _TYPE_CHUNK:
+                self._add_type(self._data[payload_offset:
+                                          payload_offset + size])
+            elif kind == _KEYFRAME_CHUNK:
+                tick = _frame_header.unpack_from(self._data,
+                                                 payload_offset)[0]
+                self.keyframes.append((tick, payload_offset
+                                       - _chunk_header.size))
+
+    def _add_type(self, payload):
+        object_type = ObjectType.unpack(payload)
+        self.types[object_type.type_id] = object_type
+
+    def _chunks(self, offset):
+        """
+            Iterate over (kind, payload offset, payload size)
+            of complete chunks, starting from <offset>
+        """
+        data = self._data
+        while offset + _chunk_header.size <= self._end:
+            kind, size = _chunk_header.unpack_from(data, offset)
+            payload_offset = offset + _chunk_header.size
+            if kind == _INDEX_CHUNK or payload_offset + size > self._end:
+                break
+            yield kind, payload_offset, size
+            offset = payload_offset + size
+
+    def _next_frame_chunk(self):
+        """
+            Kind, payload offset and end of the next frame, types are
+            read on the way. Returns None at the end of record
+        """
+        for kind, payload_offset, size in self._chunks(self._offset):
+            self._offset = payload_offset + size
+            if kind == _TYPE_CHUNK:
+                self._add_type(self._data[payload_offset:self._offset])
+            elif kind in (_KEYFRAME_CHUNK, _DELTA_CHUNK):
+                return kind, payload_offset, self._offset
+        return None
+
+    def _peek_tick(self):
+        offset = self._offset
+        chunk = self._next_frame_chunk()
+        self._offset = offset
+        if chunk is None:
+            return None
+        # номер тика - первое поле у кадров обоих типов
+        return _frame_header.unpack_from(self._data, chunk[1])[0]
+
+    def next_frame(self):
+        """
+            Read the next frame and update the state.
+            Returns (tick, changed ids, removed ids) or None at the end
+        """
+        chunk = self._next_frame_chunk()
+        if chunk is None:
+            return None
+        kind, offset, end = chunk
+        data = self._data
+        if kind == _KEYFRAME_CHUNK:
+            self.tick, count = _frame_header.unpack_from(data, offset)
+            offset += _frame_header.size
+            removed_count = 0
+            old_state, self.state = self.state, {}
+        else:
+            self.tick, count, removed_count = _delta_header.unpack_from(
+                data, offset)
+            offset += _delta_header.size
+        state = self.state
+        changed_ids = []
+        for i in range(count):
+            record = _object_record.unpack_from(data, offset)
+            offset += _object_record.size
+            state[record[0]] = record
+            changed_ids.append(record[0])
+        if kind == _KEYFRAME_CHUNK:
+            removed_ids = [obj_id for obj_id in old_state
+                           if obj_id not in state]
+        else:
+            removed_ids = struct.unpack_from('<%dI' % removed_count,
+                                             data, offset)
+            for obj_id in removed_ids:
+                state.pop(obj_id, None)
+        return self.tick, changed_ids, removed_ids
+
+    def seek(self, tick):
+        """
+            Jump to the game <tick> - decode the nearest keyframe
+            before it and delta frames up to it
+        """
+        if not self.keyframes:
+            return None
+        i = max(bisect.bisect_right(self._keyframe_ticks, tick) - 1, 0)
+        self._offset = self.keyframes[i][1]
+        self.next_frame()
+        while True:
+            next_tick = self._peek_tick()
+            if next_tick is None or next_tick > tick:
+                break
+            self.next_frame()
+        return self.tick
+
+    def state_delta(self, known_ids, changed_ids=None):
+        """
+            Make protocol.StateDelta for the UserInterface which knows
+            objects <known_ids> (will be updated). If <changed_ids>
+            is None - all states are sent
+        """
+        state = self.state
+        removed = [obj_id for obj_id in known_ids if obj_id not in state]
+        if changed_ids is None:
+            changed_ids = state.keys()
+        spawned, packed = [], []
+        for obj_id in changed_ids:
+            record = state[obj_id]
+            if obj_id in known_ids:
+                packed.append(protocol.pack_record(
+                    obj_id, record[2], record[3], record[4],
+                    record[5], record[6], ()))
+            else:
+                recorded_obj = _RecordedObject(self.types[record[1]],
+                                               record)
+                spawned.append(protocol.ObjectState(recorded_obj))
+                known_ids.add(obj_id)
+        for obj_id in removed:
+            known_ids.discard(obj_id)
+        return protocol.StateDelta(spawned, removed, ''.join(packed))
+
+    def state_deltas(self):
+        """
+            Iterate over frames from the current position, converted
+            to (tick, protocol.StateDelta) for the UserInterface
+        """
+        known_ids = set()
+        while True:
+            frame = self.next_frame()
+            if frame is None:
+                break
+            yield frame[0], self.state_delta(known_ids, frame[1])
+
+    def close(self):
+        self._data.close()
+        self._file.close()
+
+
+def play(path, speed=1.0):
+    """
+        Show recorded match, <speed> times faster than the game.
+        Arrows left/right - jump back/forward
+    """
+    reader = ReplayReader(path)
+    ui = UserInterface('robopycode replay: %s' % path)
+    step_time = constants.game_step_min_time / speed
+    known_ids = set()
+    begin = time.time()
+    shown_ticks = 0
+    while True:
+        frame = reader.next_frame()
+        if frame is None:
+            break
+        # применяем все кадры, но рисуем только когда пришло время
+        ui.update_state(reader.state_delta(known_ids, frame[1]))
+        shown_ticks += 1
+        if time.time() - begin < shown_ticks * step_time:
+            ui.ui_state_changed()
+            if ui.ui_state.the_end:
+                break
+            if ui.ui_state.seek:
+                reader.seek(reader.tick
+                            + ui.ui_state.seek * constants.replay_seek_ticks)
+                ui.update_state(reader.state_delta(known_ids))
+                ui.reset_interpolation()
+                begin = time.time()
+                shown_ticks = 0
+            ui.draw()
+            time_rest = begin + shown_ticks * step_time - time.time()
+            if time_rest > 0:
+                time.sleep(time_rest)
+    reader.close()
+    ui.quit()
+
+
+if __name__ == '__main__':
+    play(sys.argv[1])
@@ -143,7 +143,7 @@ class CooperativeTank(Tank):
 
     def follow_target(self, with_move=True):
         if self.is_near_target():
-            self.debug("near_target - turned to %s" % self.target)
+            self.debug("near_target - turned to %s", self.target.id)
             self.turn_to(self.target)
             self.fire()
             self.state = 'hunt'
@@ -208,23 +208,23 @@ class CooperativeTank(Tank):
         return None
 
 
-scene = Scene('Tanks world')
+if __name__ == '__main__':
+    scene = Scene('Tanks world')
 
-deploy1 = Point(constants.field_width - 100, 100)
-army_1 = [SimpleTank(pos=deploy1) for i in range(5)]
+    deploy1 = Point(constants.field_width - 100, 100)
+    army_1 = [SimpleTank(pos=deploy1) for i in range(5)]
 
-deploy2 = Point(100, constants.field_height - 100)
-army_2 = [CooperativeTank(pos=deploy2) for i in range(5)]
+    deploy2 = Point(100, constants.field_height - 100)
+    army_2 = [CooperativeTank(pos=deploy2) for i in range(5)]
 
-deploy3 = Point(100, 100)
-targets = [Target(pos=deploy3) for i in range(4)]
-targets += [Target(pos=deploy3, auto_fire=True) for i in range(4)]
+    deploy3 = Point(100, 100)
+    targets = [Target(pos=deploy3) for i in range(4)]
+    targets += [Target(pos=deploy3, auto_fire=True) for i in range(4)]
 
-second_pos = (constants.field_width - 20, constants.field_height - 20)
-targets += [
-    StaticTarget(pos=(20, 20), angle=90),
-    StaticTarget(pos=second_pos, angle=-90, auto_fire=True)
-]
+    second_pos = (constants.field_width - 20, constants.field_height - 20)
+    targets += [
+        StaticTarget(pos=(20, 20), angle=90),
+        StaticTarget(pos=second_pos, angle=-90, auto_fire=True)
+    ]
 
-if __name__ == '__main__':
     scene.go()
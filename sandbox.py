@@ -0,0 +1,314 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+    Robots code in the separate processes. Every team (robot class)
+    gets its worker process with the replicas of the team tanks.
+    Every game tick the engine sends to the workers the snapshot of
+    the tanks and the events of the team tanks, workers run the handlers
+    and return the orders - movement, turning and fire
+"""
+
+import random
+import time
+from multiprocessing import Process, Pipe
+
+import constants
+import engine
+import events
+import objects
+from geometry import Point, Vector
+
+
+class _RemoteTank(objects.Tank):
+    """
+        Tank of the other team as the robot code sees it in the worker
+    """
+
+    def __init__(self, obj_id):
+        self.id = obj_id
+        self.coord = Point.from_xy(0, 0)
+        self.target_coord = Point.from_xy(0, 0)
+        self.vector = Vector.from_xy(0, 0)
+        self.course = 0
+        self._armor = 0
+        self._selected = False
+        self._state = 'stopped'
+        self._need_moving = False
+        self.gun = objects.Gun(self)
+
+
+def _snapshot(obj):
+    """
+        Sensor data and orders of the tank
+    """
+    vector = obj.vector
+    return (obj.id, obj.coord.x, obj.coord.y, obj.course, obj._armor,
+            obj.gun.heat, obj.gun._state, obj._state, obj._need_moving,
+            (vector.dx, vector.dy, vector.angle, vector.module),
+            (obj.target_coord.x, obj.target_coord.y), obj._selected)
+
+
+def _orders(obj):
+    """
+        Orders of the tank after the handlers
+    """
+    vector = obj.vector
+    return (obj._state, obj._need_moving,
+            (vector.dx, vector.dy, vector.angle, vector.module),
+            (obj.target_coord.x, obj.target_coord.y))
+
+
+def _make_vector(dx, dy, angle, module):
+    vector = Vector.from_xy(dx, dy)
+    vector.angle, vector.module = angle, module
+    return vector
+
+
+def _apply_snapshot(obj, snapshot):
+    (obj_id, x, y, obj.course, obj._armor, obj.gun.heat, obj.gun._state,
+     obj._state, obj._need_moving, vector, target, obj._selected) = snapshot
+    obj.coord.x, obj.coord.y = x, y
+    obj.vector = _make_vector(*vector)
+    obj.target_coord = Point(*target)
+
+
+def _apply_orders(obj, orders):
+    obj._state, obj._need_moving, vector, target = orders
+    obj.vector = _make_vector(*vector)
+    obj.target_coord = Point(*target)
+    if obj._slot is not None:
+        obj._physics.load(obj)
+
+
+def pack_event(event):
+    """
+        Event for the other process - game objects are replaced by ids
+    """
+    event_objs = event._event_objs
+    if isinstance(event_objs, objects.GameObject):
+        event_objs = ('obj', event_objs.id)
+    elif isinstance(event_objs, Point):
+        event_objs = ('point', (event_objs.x, event_objs.y))
+    elif event_objs:
+        event_objs = ('objs', [obj.id for obj in event_objs])
+    else:
+        event_objs = None
+    return event.__class__.__name__, event_objs
+
+
+def _known_obj(known_objs, obj_id):
+    if obj_id not in known_objs:
+        # родился и погиб за один тик - снимка не было
+        known_objs[obj_id] = _RemoteTank(obj_id)
+    return known_objs[obj_id]
+
+
+def unpack_event(packed, known_objs):
+    """
+        Event from the other process, <known_objs> - objects by ids
+    """
+    class_name, event_objs = packed
+    event_class = getattr(events, class_name)
+    if event_objs is None:
+        return event_class()
+    kind, value = event_objs
+    if kind == 'obj':
+        return event_class(_known_obj(known_objs, value))
+    if kind == 'point':
+        return event_class(Point(*value))
+    return event_class([_known_obj(known_objs, obj_id) for obj_id in value])
+
+
+def _team_worker(conn, robot_class, snapshots, cpu_budget, seed):
+    """
+        Worker process of the team - runs handlers of the team tanks
+    """
+    random.seed(seed)
+    scene = engine.Scene('%s sandbox' % robot_class.__name__)
+    known_objs = {}
+    for snapshot in snapshots:
+        obj_id, x, y, course = snapshot[:4]
+        tank = robot_class(pos=Point(x, y), angle=course)
+        # в реестре сцены процесса - под id движка
+        scene.grounds.remove(tank)
+        scene.grounds.flush()
+        tank.id = obj_id
+        scene.grounds.add(tank)
+        # рождение пришлет движок вместе с другими событиями
+        scene.dispatcher.take(tank)
+        known_objs[obj_id] = tank
+    team_ids = set(known_objs)
+    while True:
+        message = conn.recv()
+        if message is None:
+            break
+        snapshots, batches = message
+        alive_ids = set()
+        for snapshot in snapshots:
+            obj_id = snapshot[0]
+            alive_ids.add(obj_id)
+            _apply_snapshot(_known_obj(known_objs, obj_id), snapshot)
+        for obj_id, obj in known_objs.iteritems():
+            if obj_id not in alive_ids:
+                # взорван - для роботов броня кончилась
+                obj._armor = 0
+        results = []
+        for tank_id, packed_events in batches:
+            tank = known_objs[tank_id]
+            for packed in packed_events:
+                scene.dispatcher.post(tank, unpack_event(packed, known_objs))
+            gun_was_loaded = tank.gun._state == 'loaded'
+            started_at = time.clock()
+            scene.dispatcher.dispatch(tank)
+            spent = time.clock() - started_at
+            fired = gun_was_loaded and tank.gun._state == 'reloading'
+            results.append((tank_id, spent > cpu_budget, spent,
+                            _orders(tank), fired))
+            # снаряды и взрывы тут не нужны - их делает движок
+            scene.shots.clear()
+            scene.explosions.clear()
+        for obj_id in list(known_objs):
+            if obj_id not in alive_ids and obj_id not in team_ids:
+                del known_objs[obj_id]
+        conn.send(results)
+
+
+class TeamSandbox:
+    """
+        Worker process of one team and its statistics.
+        If handlers of the tank spend more than <cpu_budget> seconds
+        of CPU time in the tick - its orders are skipped. If the worker
+        does not answer in time - the whole team skips the tick, till the
+        worker is free again
+    """
+
+    def __init__(self, robot_class, tanks,
+                 cpu_budget=constants.robot_cpu_budget, seed=None):
+        self.robot_class = robot_class
+        self.tank_ids = set([tank.id for tank in tanks])
+        self.cpu_budget = cpu_budget
+        self.cpu_time = 0.0
+        self.overruns = {}
+        self.skipped_ticks = 0
+        self._busy = False
+        self._alive = True
+        if seed is None:
+            seed = random.randint(0, 2 ** 30)
+        self._conn, child_conn = Pipe()
+        self._process = Process(
+            target=_team_worker,
+            args=(child_conn, robot_class, [_snapshot(tank) for tank in tanks],
+                  cpu_budget, seed))
+        self._process.daemon = True
+        self._process.start()
+        for tank in tanks:
+            tank._sandbox = self
+
+    @property
+    def alive(self):
+        return self._alive
+
+    def ready(self):
+        """
+            Can the worker take the tick? False if it is still busy
+            with one of the previous ticks or dead
+        """
+        if self._busy and self._alive and self._conn.poll(0):
+            # опоздавший ответ - приказы уже неактуальны
+            self._receive()
+        if self._busy or not self._alive:
+            self.skipped_ticks += 1
+            return False
+        return True
+
+    def send(self, snapshots, batches):
+        """
+            Send tick to the worker, it must be ready()
+        """
+        self._conn.send((snapshots, batches))
+        self._busy = True
+
+    def _receive(self):
+        try:
+            results = self._conn.recv()
+        except EOFError:
+            # процесс умер - команда больше не играет
+            self._alive = False
+            return None
+        self._busy = False
+        return results
+
+    def receive(self, timeout):
+        """
+            Results of the sent tick or None if the worker
+            did not answer in <timeout> seconds
+        """
+        if not self._busy or not self._alive:
+            return None
+        if not self._conn.poll(timeout):
+            self.skipped_ticks += 1
+            return None
+        results = self._receive()
+        if results is None:
+            return None
+        valid = []
+        for tank_id, overrun, spent, orders, fired in results:
+            self.cpu_time += spent
+            if overrun:
+                self.overruns[tank_id] = self.overruns.get(tank_id, 0) + 1
+            else:
+                valid.append((tank_id, orders, fired))
+        return valid
+
+    def close(self):
+        """
+            Stop the worker process
+        """
+        if self._alive and not self._busy:
+            try:
+                self._conn.send(None)
+            except IOError:
+                pass
+        self._process.join(1)
+        if self._process.is_alive():
+            self._process.terminate()
+            self._process.join()
+
+
+def run_sandboxes(sandboxes, grounds, dispatcher,
+                  deadline=constants.robot_tick_deadline):
+    """
+        Run handlers of the isolated tanks in the workers of all teams
+        at once and apply the orders in the order of tanks ids
+    """
+    ready = set([sandbox for sandbox in sandboxes if sandbox.ready()])
+    batches = {}
+    for obj in grounds:
+        team_sandbox = obj._sandbox
+        if team_sandbox in ready:
+            packed_events = [pack_event(event)
+                             for event in dispatcher.take(obj)]
+            if packed_events:
+                batches.setdefault(team_sandbox, []).append(
+                    (obj.id, packed_events))
+        elif team_sandbox is not None and not team_sandbox.alive:
+            # команда выбыла - события копить незачем
+            dispatcher.take(obj)
+        # у занятой команды события ждут в очереди до следующего тика
+    sent = [sandbox for sandbox in sandboxes if batches.get(sandbox)]
+    if sent:
+        snapshots = [_snapshot(obj) for obj in grounds]
+        for sandbox in sent:
+            sandbox.send(snapshots, batches[sandbox])
+    finish_time = time.time() + deadline
+    orders = []
+    for sandbox in sent:
+        results = sandbox.receive(max(finish_time - time.time(), 0))
+        if results:
+            orders.extend(results)
+    orders.sort()
+    for tank_id, tank_orders, fired in orders:
+        tank = grounds.get(tank_id)
+        _apply_orders(tank, tank_orders)
+        if fired:
+            tank.fire()
@@ -0,0 +1,76 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import time
+
+import constants
+
+
+class Scheduler:
+    """
+        Fixed game step scheduler. Real time is accumulated and spent
+        by whole game steps, so game speed does not drift with load.
+        After a long delay no more than max_catch_up steps are done at once,
+        the rest of delay is forgotten.
+        Speed: 1 - real time, N - N times faster, None - unthrottled
+    """
+
+    def __init__(self, speed=1.0, step_time=constants.game_step_min_time,
+                 max_catch_up=constants.game_max_catch_up_steps,
+                 render_fps=None):
+        self.speed = speed
+        self.step_time = step_time
+        self.max_catch_up = max_catch_up
+        if render_fps:
+            self.render_interval = 1.0 / render_fps
+        else:
+            self.render_interval = 0
+        self._accumulator = 0.0
+        self._last_time = None
+        self._last_render_time = 0
+
+    def reset(self):
+        """
+            Forget accumulated time - for example when game is paused
+        """
+        self._accumulator = 0.0
+        self._last_time = None
+
+    def steps_due(self):
+        """
+            How many game steps must be done now
+        """
+        if self.speed is None:
+            return 1
+        now = time.time()
+        if self._last_time is not None:
+            self._accumulator += (now - self._last_time) * self.speed
+        self._last_time = now
+        steps = int(self._accumulator // self.step_time)
+        if steps > self.max_catch_up:
+            # не догоняем бесконечно - отставание забываем
+            steps = self.max_catch_up
+            self._accumulator %= self.step_time
+        else:
+            self._accumulator -= steps * self.step_time
+        return steps
+
+    def render_due(self):
+        """
+            Is it time to send new frame to UI
+        """
+        now = time.time()
+        if now - self._last_render_time < self.render_interval:
+            return False
+        self._last_render_time = now
+        return True
+
+    def wait(self):
+        """
+            Sleep till the next game step
+        """
+        if self.speed is None:
+            return
+        time_rest = (self.step_time - self._accumulator) / self.speed
+        if time_rest > 0:
+            time.sleep(time_rest)
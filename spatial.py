@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+
+class SpatialGrid:
+    """
+        Uniform grid of game objects - fast search of the neighbours.
+        Objects must be not farther than cell size for to be found
+    """
+
+    def __init__(self, cell_size, objs=()):
+        self.cell_size = float(cell_size)
+        self._cells = {}
+        self._obj_cells = {}
+        self._order = {}
+        self._added = 0
+        for obj in objs:
+            self.add(obj)
+
+    def __len__(self):
+        return len(self._obj_cells)
+
+    def __contains__(self, obj):
+        return obj.id in self._obj_cells
+
+    def _cell_of(self, coord):
+        return (int(coord.x // self.cell_size),
+                int(coord.y // self.cell_size))
+
+    def add(self, obj):
+        """
+            Put object to the grid cell by its coordinates
+        """
+        cell = self._cell_of(obj.coord)
+        self._cells.setdefault(cell, []).append(obj)
+        self._obj_cells[obj.id] = cell
+        self._order[obj.id] = self._added
+        self._added += 1
+
+    def remove(self, obj):
+        """
+            Remove object from the grid
+        """
+        cell = self._obj_cells.pop(obj.id, None)
+        if cell is None:
+            return
+        self._cells[cell].remove(obj)
+        del self._order[obj.id]
+
+    def move(self, obj):
+        """
+            Object coordinates was changed - move it to the new cell.
+            Returns True if the cell was changed
+        """
+        old_cell = self._obj_cells.get(obj.id)
+        if old_cell is None:
+            return False
+        cell = self._cell_of(obj.coord)
+        if cell == old_cell:
+            return False
+        self._cells[old_cell].remove(obj)
+        self._cells.setdefault(cell, []).append(obj)
+        self._obj_cells[obj.id] = cell
+        return True
+
+    def neighbours(self, coord, after=None):
+        """
+            Objects from the cell of <coord> and cells around it,
+            in the order of adding to the grid. If <after> object is
+            specified - only objects added later than it
+        """
+        cell_x, cell_y = self._cell_of(coord)
+        cells = self._cells
+        found = []
+        for x in (cell_x - 1, cell_x, cell_x + 1):
+            for y in (cell_y - 1, cell_y, cell_y + 1):
+                cell_objs = cells.get((x, y))
+                if cell_objs:
+                    found.extend(cell_objs)
+        order = self._order
+        if after is not None:
+            after_order = order[after.id]
+            found = [obj for obj in found if order[obj.id] > after_order]
+        found.sort(key=lambda obj: order[obj.id])
+        return found
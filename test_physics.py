@@ -0,0 +1,60 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import unittest
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+import engine
+from geometry import Point
+from objects import StaticTarget, Shot
+
+
+class ReleasedSlotTest(unittest.TestCase):
+    """
+        Followers of the object that left the game must not follow
+        the new object that took its slot
+    """
+
+    def setUp(self):
+        if numpy is None:
+            self.skipTest('numpy is not installed')
+        self.scene = engine.Scene('test', numpy_physics=True)
+
+    def test_followed_target_dies_and_slot_is_reused(self):
+        follower = StaticTarget(pos=Point(100, 100))
+        target = StaticTarget(pos=Point(400, 100))
+        follower.move_at(target)
+        physics = self.scene.physics
+        target_slot = target._slot
+
+        physics.release(target)
+        shot = Shot(pos=Point(700, 500), direction=0)
+        self.assertEqual(shot._slot, target_slot)
+
+        self.assertEqual((follower.target_coord.x, follower.target_coord.y),
+                         (400, 100))
+        follower.stop()
+        self.assertEqual(physics.target_slots[follower._slot], -1)
+        self.assertEqual(tuple(physics.targets[follower._slot]), (400, 100))
+
+    def test_follower_dies_before_its_target(self):
+        follower = StaticTarget(pos=Point(100, 100))
+        target = StaticTarget(pos=Point(400, 100))
+        follower.move_at(target)
+        physics = self.scene.physics
+        follower_slot = follower._slot
+
+        follower.detonate()
+        target.detonate()
+        self.scene._flush_removed()
+        # слоты отдаются по порядку - догонявший раньше своей цели
+        self.scene._game_step()
+        self.assertEqual(physics.target_slots[follower_slot], -1)
+
+
+if __name__ == '__main__':
+    unittest.main()
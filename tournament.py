@@ -0,0 +1,119 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+    Tournament of robot classes - many headless matches in a process pool.
+    Run as script to compare the sample robots:
+
+        python tournament.py
+"""
+
+import random
+from multiprocessing import Pool
+
+import engine
+
+
+class TournamentResult:
+    """
+        Aggregated results of the tournament matches
+    """
+
+    def __init__(self, robot_classes):
+        self.matches = 0
+        self.draws = 0
+        self.wins = {}
+        for robot_class in robot_classes:
+            self.wins[robot_class.__name__] = 0
+
+    def add(self, match_result):
+        """
+            Count one more match result
+        """
+        self.matches += 1
+        winner = get_winner(match_result)
+        if winner is None:
+            self.draws += 1
+        else:
+            self.wins[winner] += 1
+
+    def win_rates(self):
+        """
+            Share of won matches by robot class name
+        """
+        rates = {}
+        for name, wins in self.wins.iteritems():
+            rates[name] = float(wins) / self.matches if self.matches else 0.0
+        return rates
+
+    def __str__(self):
+        rates = ' '.join(['%s=%.2f' % item
+                          for item in sorted(self.win_rates().items())])
+        return 'tournament(matches=%s draws=%s %s)' \
+                % (self.matches, self.draws, rates)
+
+    def __repr__(self):
+        return str(self)
+
+
+def get_winner(match_result):
+    """
+        Robot class name of the only surviving team, None for the draw
+    """
+    teams = set([match_result.classes[tank_id]
+                 for tank_id in match_result.survivors])
+    if len(teams) == 1:
+        return teams.pop()
+    return None
+
+
+def _one_team_left(scene):
+    return len(set([tank.__class__ for tank in scene.grounds])) <= 1
+
+
+def play_match(args):
+    """
+        Play one headless match, it will be run in a pool worker.
+        Random seed defines starting positions and courses of the tanks
+    """
+    robot_classes, tanks_per_team, max_ticks, seed = args
+    random.seed(seed)
+    scene = engine.Scene('match %s' % seed)
+    for robot_class in robot_classes:
+        for i in range(tanks_per_team):
+            robot_class()
+    return scene.run_headless(max_ticks, stop_condition=_one_team_left)
+
+
+def run_tournament(robot_classes, matches, tanks_per_team=5,
+                   max_ticks=5000, processes=None, seed=0, on_result=None):
+    """
+        Play <matches> between <robot_classes> on all the CPU cores.
+        Every match gets its own seed and its own worker process.
+        <on_result>(match_result, tournament_result) is called for
+        each finished match
+    """
+    tournament_result = TournamentResult(robot_classes)
+    tasks = [(robot_classes, tanks_per_team, max_ticks, seed + i)
+             for i in range(matches)]
+    # один матч на процесс - классовые атрибуты роботов не перемешаются
+    pool = Pool(processes=processes, maxtasksperchild=1)
+    try:
+        for match_result in pool.imap_unordered(play_match, tasks):
+            tournament_result.add(match_result)
+            if on_result is not None:
+                on_result(match_result, tournament_result)
+    finally:
+        pool.terminate()
+        pool.join()
+    return tournament_result
+
+
+def _print_progress(match_result, tournament_result):
+    print '%s -> %s' % (match_result, get_winner(match_result))
+
+
+if __name__ == '__main__':
+    from sample_game import SimpleTank, CooperativeTank
+
+    print run_tournament([SimpleTank, CooperativeTank], matches=20,
+                         max_ticks=2000, on_result=_print_progress)
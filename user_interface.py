@@ -3,7 +3,7 @@
 
 import pygame
 from pygame.locals import *
-from pygame.sprite import Sprite, DirtySprite, Group
+from pygame.sprite import DirtySprite, Group, LayeredDirty
 from pygame.font import Font
 from pygame.transform import flip
 from pygame.draw import line, circle, rect, aalines
@@ -13,13 +13,21 @@ import common
 import constants
 import os
 import random
+from math import pi, cos, sin
+from timeit import default_timer as timer
 from geometry import Point
+from profiler import TickStats
 
 _debug = common._debug
 log = common.log
 _max_layers = 5
 _sprites_by_layer = [Group() for i in range(_max_layers + 1)]
-_images_cash = {}
+# отметки брони, нагрева и выделения, накладываются поверх кадра -
+# общие для всех спрайтов и углов поворота, (размер, отметки) -> картинка
+_overlays_cache = {}
+# надписи, (текст, цвет) -> картинка
+_texts_cache = {}
+_font = None
 
 
 class RoboSprite(DirtySprite):
@@ -28,6 +36,11 @@ class RoboSprite(DirtySprite):
     """
     _img_file_name = 'empty.png'
     _layer = 0
+    # картинки, инициализируется в UserInterface
+    atlas = None
+    # доля пути от предыдущего кадра движка к последнему и номер
+    # последнего кадра, ставится в UserInterface.draw
+    interpolation = (1.0, 0)
 
     def __init__(self, id, state):
         """
@@ -42,21 +55,26 @@ class RoboSprite(DirtySprite):
             self._layer = 0
         self.sprite_containers = (self.sprite_containers,
                                   _sprites_by_layer[self._layer])
-        Sprite.__init__(self, self.sprite_containers)
+        DirtySprite.__init__(self, self.sprite_containers)
 
-        image = load_image(self.state._img_file_name, -1)
-        self.images = [image, flip(image, 1, 0),
-                       flip(image, 0, 1), flip(image, 1, 1)]
-        self.image = self.images[0].copy()
+        self.images = self.atlas.frames(self.state._img_file_name)
+        self.image = self.images[0]
         self.rect = self.image.get_rect()
         self._debug_color = (
             random.randint(200, 255),
             random.randint(50, 255),
             0
            )
-        self._id_font = Font(None, 27)
-#        self._armor_pixels = 0
         self._selected = False
+        # что показано на экране - для перерисовки только изменившихся
+        self._shown_center = None
+        self._shown_key = None
+        # положение и курс в предыдущем кадре движка и номер кадра,
+        # в котором они сменились последними
+        self._previous = None
+        self._previous_frame = None
+        # показанные координаты и курс, с учетом интерполяции
+        self.position = None
         # для отрисовки взрывов
         self._animcycle = 3
         self._drawed_count = 0
@@ -71,68 +89,181 @@ class RoboSprite(DirtySprite):
     def __repr__(self):
         return str(self)
 
-    def _show_armor(self):
-        if hasattr(self.state, 'armor') and self.state.armor > 0:
-            bar_px = int((self.state.armor / 100.0) * self.rect.width)
-            line(self.image, (0, 255, 70), (0, 3), (bar_px, 3), 3)
-
-    def _show_gun_heat(self):
-        if hasattr(self.state, 'gun_heat') and self.state.gun_heat > 0:
+    def _overlay_key(self):
+        """
+            Quantized state of the marks drawn over the frame,
+            None if there are no marks
+        """
+        state = self.state
+        steps = constants.overlay_bar_steps
+        armor = getattr(state, 'armor', 0)
+        if armor > 0:
+            armor_level = int(armor / 100.0 * steps)
+        else:
+            armor_level = None
+        heat = getattr(state, 'gun_heat', 0)
+        if heat > 0:
             max_heat = float(constants.tank_gun_heat_after_fire)
-            bar_px = int(((max_heat - self.state.gun_heat)
-                          / max_heat) * self.rect.width)
-            line(self.image, (232, 129, 31), (0, 5),
-                (bar_px, 5), 2)
-
-    def _show_selected(self):
+            heat_level = int((max_heat - heat) / max_heat * steps)
+        else:
+            heat_level = None
         if self._selected:
-            outline_rect = pygame.Rect(0, 0,
-                self.rect.width, self.rect.height)
-            rect(self.image,
-                self._debug_color, outline_rect, 1)
-
-    def _show_tank_id(self):
-        if hasattr(self, 'state') and hasattr(self.state, 'gun_heat'):
-            id_image = self._id_font.render(str(self.id),
-                0,
-                self._debug_color)
-            self.image.blit(id_image, (5, 5))
-
-    def _show_detection(self):
-        if hasattr(self.state, '_detected_by'):
+            selected_color = self._debug_color
+        else:
+            selected_color = None
+        if armor_level is None and heat_level is None and \
+           selected_color is None and not common._debug:
+            return None
+        return armor_level, heat_level, selected_color
+
+    def _debug_key(self):
+        """
+            Debug marks: tank id and colors of the selected tanks
+            that see us by radars
+        """
+        show_id = hasattr(self.state, 'gun_heat')
+        detected_colors = tuple([obj._debug_color
+                                 for obj in self.state._detected_by
+                                 if obj._selected])
+        return show_id, detected_colors
+
+    def _compose(self, frame, overlay_key, debug_key):
+        """
+            Copy of the frame with the marks
+        """
+        image = frame.copy()
+        width, height = image.get_size()
+        overlay, area = _overlay_image((width, height), overlay_key)
+        image.blit(overlay, area.topleft, area)
+        if debug_key is not None:
+            show_id, detected_colors = debug_key
+            if show_id:
+                image.blit(_render_text(str(self.id), self._debug_color),
+                           (5, 5))
             radius = 0
-            for obj in self.state._detected_by:
-                if obj._selected:
-                    radius += 6
-                    circle(self.image,
-                        obj._debug_color,
-                        (self.rect.width // 2,
-                         self.rect.height // 2),
-                        radius,
-                        3)
+            for color in detected_colors:
+                radius += 6
+                circle(image, color, (width // 2, height // 2), radius, 3)
+        return image
+
+    def remember_position(self, frame_number):
+        """
+            Engine frame <frame_number> is coming - keep the current
+            position for the interpolation
+        """
+        state = self.state
+        if self._previous_frame == frame_number:
+            return
+        self._previous = (state.coord.x, state.coord.y, state.course)
+        self._previous_frame = frame_number
+
+    def _interpolated_position(self):
+        """
+            Position and course between the two last engine frames
+        """
+        state = self.state
+        share, frame_number = self.interpolation
+        if share >= 1.0 or self._previous_frame != frame_number:
+            return state.coord.x, state.coord.y, state.course
+        x, y, course = self._previous
+        # поворот по кратчайшему пути - через 0 градусов тоже
+        turn = (state.course - course + 180) % 360 - 180
+        return (x + (state.coord.x - x) * share,
+                y + (state.coord.y - y) * share,
+                (course + turn * share) % 360)
 
     def update(self):
         """
             Internal function for refreshing internal variables.
             Do not call in your code!
         """
-        self.rect.center = self.state.coord.to_screen()
-        if self.state._revolvable:
-            self.image = _rotate_about_center(self.images[0],
-                                              self.state._img_file_name,
-                                              self.state.course)
-        elif self.state._animated:
+        state = self.state
+        self.position = x, y, course = self._interpolated_position()
+        if state._revolvable:
+            frame_index = int(course) % 360
+        elif state._animated:
             self._drawed_count += 1
-            self.image = self.images[self._drawed_count // self._animcycle % 4]
+            frame_index = self._drawed_count // self._animcycle % 4
+        else:
+            frame_index = 0
+        overlay_key = self._overlay_key()
+        if overlay_key is not None and common._debug:
+            debug_key = self._debug_key()
+        else:
+            debug_key = None
+        center = int(x), constants.field_height - int(y)
+        key = (frame_index, overlay_key, debug_key)
+        if center == self._shown_center and key == self._shown_key:
+            # ничего не поменялось - не перерисовываем
+            return
+        self.dirty = 1
+        self.rect.center = self._shown_center = center
+        if key == self._shown_key:
+            return
+        self._shown_key = key
+        if state._revolvable:
+            frame = self.atlas.rotated(state._img_file_name, frame_index)
         else:
-            self.image = self.images[0].copy()
+            frame = self.images[frame_index]
+        if overlay_key is None:
+            # кадр из атласа как есть, без копирования
+            self.image = frame
+            return
+        # кадр свой для каждого угла, отметки берутся из кеша
+        self.image = self._compose(frame, overlay_key, debug_key)
 
-        self._show_armor()
-        self._show_gun_heat()
-        self._show_selected()
-        if common._debug:
-            self._show_tank_id()
-            self._show_detection()
+
+class RadarFan(DirtySprite):
+    """
+        Outline of the radar beam of the selected tank (debug mode).
+        Redrawn only when the tank moved or turned
+    """
+    _layer = _max_layers
+
+    def __init__(self, tank_sprite):
+        """
+            Make beam outline of the <tank_sprite>
+        """
+        DirtySprite.__init__(self, self.sprite_containers)
+        self.tank_sprite = tank_sprite
+        self.image = pygame.Surface((1, 1), SRCALPHA)
+        self.rect = self.image.get_rect()
+        self._shown = None
+
+    def update(self):
+        """
+            Refresh outline if the tank moved
+        """
+        # спрайт танка обновлен раньше - слой ниже
+        shown = self.tank_sprite.position
+        if shown == self._shown:
+            return
+        self._shown = shown
+        self.dirty = 1
+        x, y, course = shown
+        angle = constants.tank_radar_angle
+        angle_r = (course - angle // 2) / 180.0 * pi
+        angle_l = (course + angle // 2) / 180.0 * pi
+        radar_range = constants.tank_radar_range
+        points = [
+            Point(x + cos(angle_r) * radar_range,
+                  y + sin(angle_r) * radar_range),
+            Point(x + cos(angle_l) * radar_range,
+                  y + sin(angle_l) * radar_range),
+            Point(x, y)
+        ]
+        points = [point.to_screen() for point in points]
+        xs = [point[0] for point in points]
+        ys = [point[1] for point in points]
+        left, top = min(xs) - 1, min(ys) - 1
+        width, height = max(xs) - left + 2, max(ys) - top + 2
+        self.image = pygame.Surface((width, height), SRCALPHA)
+        aalines(self.image,
+                self.tank_sprite._debug_color,
+                True,
+                [(point_x - left, point_y - top)
+                 for point_x, point_y in points])
+        self.rect = pygame.Rect(left, top, width, height)
 
 
 class UserInterfaceState:
@@ -144,6 +275,8 @@ class UserInterfaceState:
         self.switch_debug = False
         self.the_end = False
         self.selected_ids = []
+        # перемотка при просмотре записи: -1 назад, 1 вперед
+        self.seek = 0
         # внутренние для хранения состояния мыши
         self._mouse_pos = None
         self._mouse_buttons = None
@@ -180,34 +313,82 @@ class UserInterface:
         self.background = self.background.convert()
         self.background.fill(constants.background_color)  # заполняем цветом
         self.clear_screen()
+        # картинки - после set_mode, для перевода в формат экрана
+        RoboSprite.atlas = ImageAtlas()
 
-        self.all = pygame.sprite.LayeredUpdates()
+        # перерисовываются только изменившиеся спрайты и фон под ними
+        self.all = LayeredDirty()
+        self.all.clear(self.screen, self.background)
         RoboSprite.sprite_containers = self.all
+        RadarFan.sprite_containers = self.all
         Fps.sprite_containers = self.all
+        TickStatsMeter.sprite_containers = self.all
+        self.radar_fans = {}
 
         global clock
         clock = Clock()
 
         self.fps_meter = Fps(color=(255, 255, 0))
+        self.stats_meter = TickStatsMeter(color=(255, 255, 0))
 
         self._step = 0
         self.debug = False
 
         self.game_objects = {}
         self.ui_state = UserInterfaceState()
+        self.mouse_buttons = (0, 0, 0)
+        # номер кадра движка только растет - спрайты сравнивают с ним
+        # номер кадра, в котором запомнили предыдущее положение
+        self._frame_number = 0
+        self.reset_interpolation()
 
-    def run(self, child_conn):
+    def reset_interpolation(self):
+        """
+            Forget the engine frames times - objects are shown where
+            they are, without moving from the previous positions
+            (after the jump in the replay, for example)
+        """
+        self._frame_times = (None, None)
+
+    def _interpolation_share(self):
+        """
+            Share of the way from the previous engine frame to the last
+            one for objects to be shown at. The picture lags behind
+            the engine by one frame, but objects move smoothly
+            whatever the engine ticks rate is
+        """
+        previous_time, last_time = self._frame_times
+        if previous_time is None:
+            return 1.0
+        period = last_time - previous_time
+        if not 0 < period <= constants.ui_interpolation_max_period:
+            # пошаговая отладка или пауза - показываем как есть
+            return 1.0
+        return min((timer() - last_time) / period, 1.0)
+
+    def run(self, child_conn, frames=None):
+        """
+            Main UI cycle. Objects states changes come through
+            the <child_conn> pipe and, if given, the latest
+            states - through the <frames> shared memory buffer
+        """
         self.child_conn = child_conn
         while True:
             try:
-                objects_state = None
                 # проверяем есть ли данные на том конце трубы
                 while self.child_conn.poll(0):
-                    # данные есть - считываем все что есть
-                    objects_state = self.child_conn.recv()
-                if objects_state:
-                    # были получены данные - обновляемся
-                    self.update_state(objects_state)
+                    # данные есть - это изменения, применяем все по порядку
+                    message = self.child_conn.recv()
+                    if isinstance(message, TickStats):
+                        # замеры фаз игрового шага от профайлера движка
+                        self.stats_meter.stats = message
+                    else:
+                        self.update_state(message)
+                if frames is not None:
+                    # последний кадр из общей памяти, старые не читаем
+                    records = frames.read_latest()
+                    if records:
+                        self.update_records(records)
                 # проверяем - изменилось ли что-то у пользователя
                 if self.ui_state_changed() or self.ui_state.one_step:
                     # изменилось - отсылаем состояние в трубу
@@ -219,43 +400,56 @@ class UserInterface:
                 self.draw()
             except Exception, exc:
                 print exc
-        # очистка
+        self.quit()
+
+    def quit(self):
+        """
+            Kill all sprites and close the window
+        """
         for sprite in self.all:
             sprite.kill()
         pygame.quit()
 
-    def update_state(self, objects_state):
+    def update_state(self, state_delta):
         """
-            renew game objects states, create/delete sprites if need
+            apply game objects states changes (protocol.StateDelta),
+            create/delete sprites if need
         """
-        new_ids = set(objects_state)
-        old_ids = set(self.game_objects)
-        new_game_objects = {}
-
-        for id in old_ids - new_ids:
-            # старые объекты - убиваем спрайты
-            sprite = self.game_objects[id]
-            sprite.kill()
+        for id in state_delta.removed:
+            # умершие объекты - убиваем спрайты
+            sprite = self.game_objects.pop(id, None)
+            if sprite:
+                sprite.kill()
 
-        for id in new_ids - old_ids:
+        for state in state_delta.spawned:
             # новые объекты - создаем спрайты
-            sprite = RoboSprite(id=id, state=objects_state[id])
-            new_game_objects[id] = sprite
+            self.game_objects[state.id] = RoboSprite(id=state.id,
+                                                     state=state)
 
-        for id in old_ids & new_ids:
-            # существующие объекты - обновляем состояния
-            sprite = self.game_objects[id]
-            state = objects_state[id]
-            sprite.update_state(state)
-            new_game_objects[id] = sprite
+        self.update_records(state_delta.records())
 
-        self.game_objects = new_game_objects
+    def update_records(self, records):
+        """
+            renew dynamic fields of game objects states
+        """
+        new_frame = True
+        for record in records:
+            # существующие объекты - обновляем состояния
+            sprite = self.game_objects.get(record[0])
+            if sprite:
+                if new_frame:
+                    # кадр движка - время прихода, для интерполяции
+                    new_frame = False
+                    self._frame_number += 1
+                    self._frame_times = (self._frame_times[1], timer())
+                sprite.remember_position(self._frame_number)
+                sprite.state.update(*record[1:])
 
         # преобразуем список айдишников в список обьектов
         for obj_id, obj in self.game_objects.iteritems():
             obj.state._detected_by = [
                 self.game_objects[detected_by_id]
-                for detected_by_id in obj.state._detected_by
+                for detected_by_id in obj.state._detected_by_ids
                 if detected_by_id in self.game_objects
             ]
 
@@ -269,6 +463,8 @@ class UserInterface:
         for event in pygame.event.get():
             if event.type == KEYDOWN and event.key == K_f:
                 self.fps_meter.show = not self.fps_meter.show
+            if event.type == KEYDOWN and event.key == K_p:
+                self.stats_meter.show = not self.stats_meter.show
 
             if ((event.type == QUIT) or
                     (event.type == KEYDOWN and event.key == K_ESCAPE) or
@@ -278,6 +474,10 @@ class UserInterface:
                 self.ui_state.switch_debug = True
             if event.type == KEYDOWN and event.key == K_s:
                 self.ui_state.one_step = True
+            if event.type == KEYDOWN and event.key == K_LEFT:
+                self.ui_state.seek = -1
+            if event.type == KEYDOWN and event.key == K_RIGHT:
+                self.ui_state.seek = 1
         key = pygame.key.get_pressed()
         if key[pygame.K_g]:  # если нажата и удерживается
             self.ui_state.one_step = True
@@ -286,9 +486,6 @@ class UserInterface:
         self._select_objects()
 
         if self.ui_state.switch_debug:
-            if common._debug:
-                # были в режиме отладки
-                self.clear_screen()
             # переключаем и тут тоже - потому что отдельный процесс
             common._debug = not common._debug
 
@@ -322,51 +519,38 @@ class UserInterface:
         self.screen.blit(self.background, (0, 0))
         pygame.display.flip()
 
-    def _draw_radar_outline(self, obj):
-        from math import pi, cos, sin
-
-        angle = constants.tank_radar_angle
-        angle_r = (obj.state.course - angle // 2) / 180.0 * pi
-        angle_l = (obj.state.course + angle // 2) / 180.0 * pi
-        coord = obj.state.coord
-        radar_range = constants.tank_radar_range
-        points = [
-            Point(coord.x + cos(angle_r) * radar_range,
-                  coord.y + sin(angle_r) * radar_range),
-            Point(coord.x + cos(angle_l) * radar_range,
-                  coord.y + sin(angle_l) * radar_range),
-            Point(coord.x,
-                  coord.y)
-        ]
-        points = [x.to_screen() for x in points]
-        aalines(self.screen,
-                            obj._debug_color,
-                            True,
-                            points)
+    def _update_radar_fans(self):
+        """
+            Radar beams of the selected tanks - in debug mode only
+        """
+        if common._debug:
+            tank_ids = set([obj_id
+                            for obj_id, obj in self.game_objects.iteritems()
+                            if obj._selected and
+                               hasattr(obj.state, 'gun_heat')])
+        else:
+            tank_ids = set()
+        for obj_id in list(self.radar_fans):
+            if obj_id not in tank_ids:
+                self.radar_fans.pop(obj_id).kill()
+        for obj_id in tank_ids:
+            if obj_id not in self.radar_fans:
+                self.radar_fans[obj_id] = RadarFan(self.game_objects[obj_id])
 
     def draw(self):
         """
             Drawing sprites on screen
         """
+        self._update_radar_fans()
+        RoboSprite.interpolation = (self._interpolation_share(),
+                                    self._frame_number)
 
-        #update all the sprites
+        #update all the sprites, changed ones become dirty
         self.all.update()
 
-        #draw the scene
-        if common._debug:
-            self.screen.blit(self.background, (0, 0))
-            dirty = self.all.draw(self.screen)
-            for obj in self.all:
-                if hasattr(obj, 'state') and \
-                   hasattr(obj.state, 'gun_heat') and \
-                   obj._selected:
-                    self._draw_radar_outline(obj)
-            pygame.display.flip()
-        else:
-            # clear/erase the last drawn sprites
-            self.all.clear(self.screen, self.background)
-            dirty = self.all.draw(self.screen)
-            pygame.display.update(dirty)
+        #draw the scene - only under the changed sprites
+        dirty = self.all.draw(self.screen)
+        pygame.display.update(dirty)
 
         #cap the framerate
         clock.tick(self._max_fps)
@@ -383,7 +567,7 @@ class Fps(DirtySprite):
         """
             Make indicator
         """
-        pygame.sprite.Sprite.__init__(self, self.sprite_containers)
+        DirtySprite.__init__(self, self.sprite_containers)
         self.show = False
         self.font = pygame.font.Font(None, 27)
         self.color = color
@@ -391,6 +575,7 @@ class Fps(DirtySprite):
         self.rect = self.image.get_rect()
         self.rect = self.rect.move(constants.field_width - 100, 10)
         self.fps = []
+        self._msg = '-'
 
     def update(self):
         """
@@ -405,12 +590,117 @@ class Fps(DirtySprite):
             msg = '%5.0f FPS' % fps
         else:
             msg = ''
+        if msg == self._msg:
+            return
+        self._msg = msg
         self.image = self.font.render(msg, 1, self.color)
+        self.rect = self.image.get_rect(topleft=self.rect.topleft)
+        self.dirty = 1
 
     def type(self):
         return 'fps'
 
 
+class TickStatsMeter(DirtySprite):
+    """
+        Show timings of the game tick phases (see Scene.stats),
+        they come from the engine if the profiler is enabled
+    """
+    _layer = 5
+    _line_height = 16
+
+    def __init__(self, color=(255, 255, 255)):
+        """
+            Make indicator
+        """
+        DirtySprite.__init__(self, self.sprite_containers)
+        self.show = False
+        self.stats = None
+        self.font = pygame.font.Font(None, 18)
+        self.color = color
+        self.image = self.font.render('', 0, self.color)
+        self.rect = self.image.get_rect()
+        self.rect = self.rect.move(constants.field_width - 300, 35)
+        self._shown = False
+        self._shown_stats = None
+
+    def update(self):
+        """
+            Refresh indicator
+        """
+        if not self.show:
+            if self._shown:
+                self.image = self.font.render('', 0, self.color)
+                self.rect = self.image.get_rect(topleft=self.rect.topleft)
+                self.dirty = 1
+                self._shown = False
+            return
+        if self._shown and self.stats is self._shown_stats:
+            return
+        if self.stats is None:
+            lines = ['no profiler stats']
+        else:
+            phases = sorted(self.stats.phases.items(),
+                            key=lambda item: -item[1]['p99'])
+            lines = ['%-20s %6.2f %6.2f ms' % (name, phase['p50'] * 1000,
+                                               phase['p99'] * 1000)
+                     for name, phase in phases]
+        self._shown = True
+        self._shown_stats = self.stats
+        self.image = pygame.Surface((300, self._line_height * len(lines)),
+                                    SRCALPHA)
+        for index, msg in enumerate(lines):
+            self.image.blit(self.font.render(msg, 1, self.color),
+                            (0, index * self._line_height))
+        self.rect = self.image.get_rect(topleft=self.rect.topleft)
+        self.dirty = 1
+
+    def type(self):
+        return 'stats'
+
+
+def _overlay_image(size, overlay_key):
+    """
+        Transparent image with the armor and gun heat bars and
+        the selection frame, one for all sprites of the size,
+        and its drawn part
+    """
+    key = (size, overlay_key)
+    if key not in _overlays_cache:
+        if len(_overlays_cache) >= constants.overlay_cache_size:
+            _overlays_cache.clear()
+        width, height = size
+        image = pygame.Surface(size, SRCALPHA)
+        steps = constants.overlay_bar_steps
+        armor_level, heat_level, selected_color = overlay_key
+        if armor_level is not None:
+            bar_px = width * armor_level // steps
+            line(image, (0, 255, 70), (0, 3), (bar_px, 3), 3)
+        if heat_level is not None:
+            bar_px = width * heat_level // steps
+            line(image, (232, 129, 31), (0, 5), (bar_px, 5), 2)
+        if selected_color is not None:
+            rect(image, selected_color, pygame.Rect(0, 0, width, height), 1)
+        # только нарисованная часть - полоски занимают несколько строк
+        _overlays_cache[key] = image, image.get_bounding_rect()
+    return _overlays_cache[key]
+
+
+def _render_text(text, color):
+    """
+        Rendered text, the font is one for all sprites
+    """
+    global _font
+    key = (text, color)
+    if key not in _texts_cache:
+        if _font is None:
+            _font = Font(None, 27)
+        if len(_texts_cache) >= constants.overlay_cache_size:
+            _texts_cache.clear()
+        _texts_cache[key] = _font.render(text, 0, color)
+    return _texts_cache[key]
+
+
 def load_image(name, colorkey=None):
     """
         Load image from file
@@ -429,22 +719,73 @@ def load_image(name, colorkey=None):
     return image
 
 
-def _rotate_about_center(image, image_name, angle):
+def _to_display_format(image):
+    """
+        Convert image to the pixel format of the screen - fast blits
+    """
+    colorkey = image.get_colorkey()
+    if image.get_flags() & SRCALPHA:
+        image = image.convert_alpha()
+    else:
+        image = image.convert()
+    if colorkey is not None:
+        image.set_colorkey(colorkey, RLEACCEL)
+    return image
+
+
+def _rotate_about_center(image, angle):
     """
         rotate an image while keeping its center and size
     """
-    global _images_cash
-    angle = int(angle)
-    try:
-        return _images_cash[image_name][angle].copy()
-    except:
-        orig_rect = image.get_rect()
-        rot_image = pygame.transform.rotate(image, angle)
-        rot_rect = orig_rect.copy()
-        rot_rect.center = rot_image.get_rect().center
-        rot_image = rot_image.subsurface(rot_rect).copy()
-        try:
-            _images_cash[image_name][angle] = rot_image
-        except:
-            _images_cash[image_name] = {angle: rot_image}
-        return rot_image.copy()
+    orig_rect = image.get_rect()
+    rot_image = pygame.transform.rotate(image, angle)
+    rot_rect = orig_rect.copy()
+    rot_rect.center = rot_image.get_rect().center
+    return rot_image.subsurface(rot_rect).copy()
+
+
+class ImageAtlas:
+    """
+        Images of the game objects, loaded once and converted to the
+        screen format. Flips and rotations by the whole degrees are made
+        beforehand - for all tanks images at once, for other revolvable
+        images at the first need. Sprites use the frames without copying,
+        so the frames must not be drawn on
+    """
+    _rotated_prefix = 'tank_'
+
+    def __init__(self):
+        self._frames = {}
+        self._rotations = {}
+        for file_name in sorted(os.listdir(constants.data_path)):
+            if file_name.endswith('.png'):
+                self._load(file_name)
+
+    def _load(self, name):
+        image = _to_display_format(load_image(name, -1))
+        self._frames[name] = [image, flip(image, 1, 0),
+                              flip(image, 0, 1), flip(image, 1, 1)]
+        if name.startswith(self._rotated_prefix):
+            self._rotate(name)
+
+    def _rotate(self, name):
+        image = self._frames[name][0]
+        self._rotations[name] = [_rotate_about_center(image, angle)
+                                 for angle in range(360)]
+
+    def frames(self, name):
+        """
+            Image and its flips: horizontal, vertical and both
+        """
+        if name not in self._frames:
+            self._load(name)
+        return self._frames[name]
+
+    def rotated(self, name, angle):
+        """
+            Image rotated by the <angle> in degrees, rounded down
+        """
+        if name not in self._rotations:
+            self.frames(name)
+            self._rotate(name)
+        return self._rotations[name][int(angle) % 360]